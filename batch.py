@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Headless batch valuation for AutoValuate
+Values every vehicle in a CSV or JSONL file without opening the UI and
+streams one JSON valuation per line to stdout or an output file.
+
+Rows that share a (city, make, model, transmission) search reuse one scrape,
+and rows that also share a generation reuse the fitted models and mileage
+index. A row that cannot be read or valued gets a record with its row number
+and an "error" message, and the rest of the file is still valued.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import math
+import reprlib
+import sys
+
+from main import (
+    search_vehicles, get_generation_range, filter_generation,
+    fit_price_model, fit_pricing_model, build_comparables, value_vehicle, LLM_EXECUTOR
+)
+from scroller import DEFAULT_TARGET_COUNT, DEFAULT_TIME_BUDGET
+from browser_extract import DEFAULT_EXTRACTION, EXTRACTION_MODES
+from listing_store import DEFAULT_TTL
+from llm_client import get_llm_client
+from tracing import span, traced_submit
+
+REQUIRED_FIELDS = ['city', 'make', 'model', 'model_year', 'transmission', 'car_mileage']
+
+# Accepted input ranges, the same the UI enforces
+MIN_MODEL_YEAR = 1900
+MAX_MODEL_YEAR = 2025
+MAX_MILEAGE_KM = 2_000_000
+
+
+def read_vehicles(path):
+    """Yield (row number, settings, error) for each row of a .csv or .jsonl file.
+    A row that cannot be parsed has settings None and the reason as error."""
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (line for line in f if line.strip())
+
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                if not isinstance(row, dict):
+                    row = json.loads(row.strip())
+                    if not isinstance(row, dict):
+                        raise ValueError("expected a JSON object")
+                yield row_number, parse_vehicle(row), None
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                yield row_number, None, str(e)
+
+
+def _whole_number(row, field, low, high):
+    """row[field] as an int in [low, high]; raises ValueError for anything else,
+    including NaN, Infinity and numbers too large for a float"""
+    try:
+        number = float(row[field])
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{field} must be a number, got {reprlib.repr(row[field])}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be finite, got {reprlib.repr(row[field])}")
+    if not low <= number <= high:
+        raise ValueError(f"{field} must be between {low} and {high}, got {reprlib.repr(row[field])}")
+    return int(number)
+
+
+def parse_vehicle(row):
+    """Normalized vehicle settings from one input row; raises ValueError if a field is missing or invalid"""
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) is None or not str(row[field]).strip()]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    # JSON rows may hold lists, objects or booleans where text or a number belongs
+    invalid = [field for field in REQUIRED_FIELDS if isinstance(row[field], (list, dict, bool))]
+    if invalid:
+        raise ValueError(f"invalid {', '.join(invalid)}")
+    return {
+        'city': str(row['city']).strip().lower(),
+        'make': str(row['make']).strip().lower(),
+        'model': str(row['model']).strip().lower(),
+        'model_year': _whole_number(row, 'model_year', MIN_MODEL_YEAR, MAX_MODEL_YEAR),
+        'transmission': str(row['transmission']).strip().lower(),
+        'car_mileage': _whole_number(row, 'car_mileage', 0, MAX_MILEAGE_KM),
+    }
+
+
+def search_key(settings):
+    """Rows with the same key share one Marketplace search"""
+    return (settings['city'], settings['make'], settings['model'], settings['transmission'])
+
+
+def _json_value(value):
+    """Make numpy scalars and NaN averages JSON serializable"""
+    if value is None or isinstance(value, str):
+        return value
+    value = float(value)
+    return None if math.isnan(value) else round(value, 2)
+
+
+def value_vehicles(rows, prompt_settings=None, scroll_options=None, max_age=DEFAULT_TTL,
+                   extraction=DEFAULT_EXTRACTION):
+    """Yield (row number, settings, result, error) for each (row number, settings, error)
+    of read_vehicles, sharing scrapes, fitted models and mileage indexes. A row whose
+    valuation fails has result None and the error message; later rows still run."""
+    searches = {}
+    generations = {}
+    models = {}
+
+    for row_number, settings, error in rows:
+        if error is not None:
+            print(f"Row {row_number}: {error}")
+            yield row_number, settings, None, error
+            continue
+
+        try:
+            row_settings = dict(settings, prompt_engineering=prompt_settings or {})
+            key = search_key(row_settings)
+
+            # One trace per row: the shared search and model fits of the first
+            # row of a key are recorded under it, the valuation under every row
+            with span('batch_row', row=row_number, city=key[0], make=key[1], model=key[2],
+                      model_year=row_settings['model_year']) as row_span:
+                # Look up the generation while the search is scraping
+                generation_key = (row_settings['make'], row_settings['model'], row_settings['model_year'])
+                row_span.set(generation_reused=generation_key in generations, search_reused=key in searches)
+                if generation_key not in generations:
+                    generations[generation_key] = traced_submit(
+                        LLM_EXECUTOR, get_generation_range, row_settings['make'], row_settings['model'],
+                        row_settings['model_year'], row_settings['city'], row_settings['prompt_engineering']
+                    )
+
+                # A failed search is not stored, so the next row with the key tries again
+                if key not in searches:
+                    searches[key] = search_vehicles(*key, scroll_options=scroll_options, max_age=max_age,
+                                                    extraction=extraction)
+                vehicle_df = searches[key]
+
+                generation_range = generations[generation_key].result()
+
+                model_key = key + generation_range
+                if model_key not in models:
+                    specific_vehicle_df = filter_generation(vehicle_df, *generation_range)
+                    with span('fit_models', listings=len(specific_vehicle_df)):
+                        models[model_key] = (fit_price_model(specific_vehicle_df, key, generation_range),
+                                             build_comparables(specific_vehicle_df),
+                                             fit_pricing_model(specific_vehicle_df))
+                lr_model, comparables, pricing_model = models[model_key]
+
+                result = value_vehicle(row_settings, vehicle_df=vehicle_df, generation_range=generation_range,
+                                       lr_model=lr_model, comparables=comparables, pricing_model=pricing_model)
+        except Exception as e:
+            print(f"Row {row_number}: error valuing vehicle: {e}")
+            yield row_number, settings, None, str(e) or type(e).__name__
+            continue
+        yield row_number, settings, result, None
+
+
+def format_valuation(settings, result):
+    """Flatten a valuation result into one JSON-serializable record"""
+    return {
+        'city': settings['city'],
+        'make': settings['make'],
+        'model': settings['model'],
+        'model_year': settings['model_year'],
+        'transmission': settings['transmission'],
+        'car_mileage': settings['car_mileage'],
+        'generation_range': '-'.join(str(year) for year in result['generation_range']),
+        'lr_predicted_price': _json_value(result['lr_predicted_price']),
+        'model_predicted_price': _json_value(result['model_predicted_price']),
+        'average_price': _json_value(result['average_price']),
+        'comparables_method': result['comparables_method'],
+        'comparables_max_distance': _json_value(result['comparables_max_distance']),
+        'predicted_price': _json_value(result['predicted_price']),
+        'vehicles_found': result['vehicles_found'],
+        'ai_price_analysis': result['ai_price_analysis'],
+        'market_insights': result['market_insights'],
+    }
+
+
+def format_error(row_number, settings, error):
+    """Record of a row that could not be read or valued"""
+    record = {'row': row_number}
+    if settings is not None:
+        record.update((field, settings[field]) for field in REQUIRED_FIELDS)
+    record['error'] = error
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Value a file of vehicles without the UI")
+    parser.add_argument('input', help="CSV or JSONL file with city, make, model, model_year, transmission, car_mileage")
+    parser.add_argument('-o', '--output', help="JSONL file to write valuations to (default: stdout)")
+    parser.add_argument('--include-context', action='store_true',
+                        help="Use enhanced prompts and request AI price analysis and market insights")
+    parser.add_argument('--temperature', type=float, default=0.3, help="AI creativity for enhanced prompts")
+    parser.add_argument('--target-listings', type=int, default=DEFAULT_TARGET_COUNT,
+                        help="Stop scrolling once this many listings are loaded")
+    parser.add_argument('--scroll-budget', type=float, default=DEFAULT_TIME_BUDGET,
+                        help="Maximum seconds to spend scrolling each search")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_TTL,
+                        help="Reuse stored listings scraped less than this many seconds ago (0 always re-scrapes)")
+    parser.add_argument('--extraction', default=DEFAULT_EXTRACTION, choices=EXTRACTION_MODES,
+                        help="Parse page_source after scrolling, or collect new cards in the browser after each scroll")
+    args = parser.parse_args(argv)
+
+    prompt_settings = {'include_context': args.include_context, 'temperature': args.temperature}
+    scroll_options = {'target_count': args.target_listings, 'time_budget': args.scroll_budget}
+
+    failed = 0
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        # Keep pipeline progress messages out of the JSONL stream
+        with contextlib.redirect_stdout(sys.stderr):
+            for row_number, settings, result, error in value_vehicles(
+                read_vehicles(args.input), prompt_settings, scroll_options, args.max_age, args.extraction
+            ):
+                if error is not None:
+                    failed += 1
+                    record = format_error(row_number, settings, error)
+                else:
+                    record = dict(row=row_number, **format_valuation(settings, result))
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if failed:
+        print(f"{failed} rows could not be valued", file=sys.stderr)
+
+    llm_client = get_llm_client()
+    stats = llm_client.stats()
+    print(f"LLM requests: {stats['requests']}, retries: {stats['retries']}, "
+          f"throttled: {stats['throttled']} ({stats['throttle_seconds']:.1f}s), failures: {stats['failures']}",
+          file=sys.stderr)
+    if llm_client.cache is not None:
+        cache_stats = llm_client.cache.stats()
+        print(f"LLM cache hits: {cache_stats['memory_hits'] + cache_stats['disk_hits']}, "
+              f"misses: {cache_stats['misses']}, bypassed: {cache_stats['bypassed']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
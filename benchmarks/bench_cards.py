@@ -0,0 +1,78 @@
+"""
+Single-pass card extraction against the original three-list path
+
+    python -m benchmarks.bench_cards [--cards 1000] [--repeat 5]
+
+The original path parsed the whole page with BeautifulSoup, ran three
+find_all scans and re-aligned locations and mileages by position. The card
+extractor walks each listing card once per backend.
+"""
+
+import argparse
+import re
+
+from bs4 import BeautifulSoup as soup
+
+from html_parsers import TITLE_CLASS, PRICE_CLASS, CONTENT_CLASS, available_backends, extract_listing_cards
+from benchmarks.bench_parsers import time_call
+from benchmarks.synthetic import marketplace_page
+
+
+def legacy_extract(html):
+    """The original main() parsing: three full-tree scans plus positional alignment"""
+    soup_obj = soup(html, 'html.parser')
+    titles_list = [title.text.strip() for title in soup_obj.find_all('span', class_=TITLE_CLASS)]
+    prices_list = [price.text.strip() for price in soup_obj.find_all('span', class_=PRICE_CLASS)]
+    content_list = [content.text.strip() for content in soup_obj.find_all('span', class_=CONTENT_CLASS)]
+
+    location_pattern = re.compile(r'^[A-Za-z\s\-]+, [A-Z]{2}$')
+    mileage_pattern = re.compile(r'^\d+K (km|miles)$')
+    location_list = []
+    mileage_list = []
+    i = 0
+    while i < len(content_list):
+        content = content_list[i]
+        if content in ["Log In", "Create new account"]:
+            i += 1
+            continue
+        if location_pattern.match(content):
+            location_list.append(content)
+            if i + 1 < len(content_list) and mileage_pattern.match(content_list[i + 1]):
+                mileage_list.append(content_list[i + 1])
+                i += 2
+            else:
+                mileage_list.append("0K km")
+                i += 1
+        else:
+            i += 1
+
+    count = min(len(titles_list), len(prices_list), len(location_list), len(mileage_list))
+    return [
+        {'title': titles_list[i], 'price': prices_list[i], 'location': location_list[i], 'mileage': mileage_list[i]}
+        for i in range(count)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark single-pass card extraction")
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    html = marketplace_page(args.cards)
+
+    results = [{'path': 'legacy bs4 three-list', 'seconds': time_call(legacy_extract, html, repeat=args.repeat)}]
+    for backend in available_backends():
+        results.append({
+            'path': f'cards {backend}',
+            'seconds': time_call(extract_listing_cards, html, backend, repeat=args.repeat),
+        })
+
+    print(f"{args.cards} cards, {len(html) // 1024}KB page")
+    for result in results:
+        print(f"{result['path']:<24}{result['seconds'] * 1000:>10.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Vectorized listing cleaning against the original filter loop
+
+    python -m benchmarks.bench_cleaning [--rows 10000 100000 1000000] [--repeat 3]
+
+Listings carry known junk: placeholder prices, giveaway prices, missing
+mileage, "$1 call me" style prices and lease-takeover monthly payments.
+Reports rows per second for both paths (the loop only up to 100k rows),
+the per-row cost to show it stays flat as scrapes grow, and how many
+junk rows each approach let through.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cleaning import PLACEHOLDER_PRICES, clean_listings
+from benchmarks.bench_parsers import time_call
+
+LEGACY_MAX_ROWS = 100_000
+
+
+def listings(count, seed=0):
+    """(DataFrame, junk mask) of normalized listings with about 6% junk rows"""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(2000, 2024, count)
+    mileages = rng.integers(10, 350, count) * 1000
+    prices = np.maximum(800, 30_000 - (2024 - years) * 1_200 - 0.02 * mileages
+                        + rng.normal(0, 1_500, count)).astype(np.int64)
+
+    kind = rng.random(count)
+    prices[kind < 0.015] = rng.choice(PLACEHOLDER_PRICES, int((kind < 0.015).sum()))
+    mileages[(kind >= 0.015) & (kind < 0.03)] = 0
+    prices[(kind >= 0.03) & (kind < 0.045)] = rng.integers(250, 650, int(((kind >= 0.03) & (kind < 0.045)).sum()))
+    prices[(kind >= 0.045) & (kind < 0.06)] = rng.integers(150_000, 999_000, int(((kind >= 0.045) & (kind < 0.06)).sum()))
+
+    vehicle_df = pd.DataFrame({'Year': years, 'Price': prices, 'Mileage': mileages})
+    return vehicle_df, kind < 0.06
+
+
+def legacy_filter(vehicles_list):
+    """The original filtered_vehicles_list loop"""
+    return [
+        vehicle for vehicle in vehicles_list
+        if vehicle['Price'] not in PLACEHOLDER_PRICES and vehicle['Mileage'] != 0 and vehicle['Price'] > 200
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark listing cleaning")
+    parser.add_argument('--rows', type=int, nargs='*', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.rows:
+        vehicle_df, junk = listings(count)
+        kept, dropped = clean_listings(vehicle_df)
+        results.append({
+            'rows': count,
+            'method': 'vectorized',
+            'seconds': time_call(clean_listings, vehicle_df, repeat=args.repeat),
+            'junk_kept': int(junk[kept.index].sum()),
+            'clean_dropped': int((~junk).sum() - (~junk[kept.index]).sum()),
+            'dropped': dropped,
+        })
+
+        if count <= LEGACY_MAX_ROWS:
+            records = vehicle_df.to_dict('records')
+            # The loop only drops junk rows here, since clean prices and mileages are never filtered
+            legacy_kept = legacy_filter(records)
+            results.append({
+                'rows': count,
+                'method': 'legacy loop',
+                'seconds': time_call(legacy_filter, records, repeat=args.repeat),
+                'junk_kept': int(junk.sum() - (count - len(legacy_kept))),
+                'clean_dropped': 0,
+                'dropped': {},
+            })
+
+    print(f"{'rows':>10}  {'method':<12}{'ms':>10}{'ns/row':>9}{'junk kept':>11}{'clean dropped':>15}")
+    for result in results:
+        print(f"{result['rows']:>10}  {result['method']:<12}{result['seconds'] * 1000:>10.1f}"
+              f"{result['seconds'] / result['rows'] * 1e9:>9.0f}{result['junk_kept']:>11}{result['clean_dropped']:>15}")
+        if result['dropped']:
+            print("            " + ", ".join(f"{rule} {count}" for rule, count in result['dropped'].items()))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mileage-index comparable queries against the per-query boolean mask
+
+    python -m benchmarks.bench_comparables [--listings 500 5000] [--targets 1000 10000] [--repeat 3]
+
+Answers every target mileage against one generation slice with the original
+pandas mask, and with MileageIndex window and k-nearest queries. The window
+means and the nearest-listing means are checked against brute force.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from comparables import COMPARABLE_MILEAGE_WINDOW, NEAREST_COMPARABLES, MileageIndex
+from benchmarks.bench_parsers import time_call
+
+
+def generation_slice(count, seed=0):
+    rng = np.random.default_rng(seed)
+    mileages = rng.integers(5, 350, count) * 1000
+    prices = np.maximum(500, 22_000 - 0.05 * mileages + rng.normal(0, 1_500, count)).astype(np.int64)
+    return pd.DataFrame({'Mileage': mileages, 'Price': prices})
+
+
+def legacy_comparables(vehicle_df, targets):
+    """The original get_comparable_price mask, once per target"""
+    return np.array([
+        vehicle_df[(vehicle_df['Mileage'] >= target - COMPARABLE_MILEAGE_WINDOW)
+                   & (vehicle_df['Mileage'] <= target + COMPARABLE_MILEAGE_WINDOW)]['Price'].mean()
+        for target in targets
+    ])
+
+
+def brute_force_nearest(vehicle_df, targets, k):
+    """Mean price of the k nearest listings per target, by a full sort of distances"""
+    mileages = vehicle_df['Mileage'].to_numpy()
+    prices = vehicle_df['Price'].to_numpy()
+    means = []
+    for target in targets:
+        distances = np.abs(mileages - target)
+        nearest = np.argsort(distances, kind='stable')[:k]
+        # Any listing tied with the k-th distance is an equally valid choice
+        means.append((prices[nearest].mean(), distances[nearest].max()))
+    return means
+
+
+def check_parity(vehicle_df, index, targets):
+    expected = legacy_comparables(vehicle_df, targets)
+    _, means = index.window(targets)
+    if not np.allclose(means, expected, equal_nan=True):
+        raise AssertionError("window means differ from the boolean mask")
+
+    _, distances = index.nearest(targets)
+    for (_, expected_distance), distance in zip(brute_force_nearest(vehicle_df, targets, NEAREST_COMPARABLES),
+                                                distances):
+        if expected_distance != distance:
+            raise AssertionError("nearest listings differ from brute force")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark comparable-listing queries")
+    parser.add_argument('--listings', type=int, nargs='*', default=[500, 5000])
+    parser.add_argument('--targets', type=int, nargs='*', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    results = []
+    for listing_count in args.listings:
+        vehicle_df = generation_slice(listing_count)
+        index = MileageIndex.from_frame(vehicle_df)
+        check_parity(vehicle_df, index, rng.integers(0, 400_000, 200))
+
+        for target_count in args.targets:
+            targets = rng.integers(0, 400_000, target_count)
+            timings = [
+                ('mask', time_call(legacy_comparables, vehicle_df, targets[:1000], repeat=1) * target_count / min(1000, target_count)),
+                ('index build', time_call(MileageIndex.from_frame, vehicle_df, repeat=args.repeat)),
+                ('window', time_call(index.window, targets, repeat=args.repeat)),
+                ('nearest', time_call(index.nearest, targets, repeat=args.repeat)),
+                ('comparable', time_call(index.comparable_prices, targets, repeat=args.repeat)),
+            ]
+            for method, seconds in timings:
+                results.append({'listings': listing_count, 'targets': target_count, 'method': method, 'seconds': seconds})
+
+    print(f"{'listings':>10}{'targets':>10}  {'method':<14}{'ms':>10}")
+    for result in results:
+        print(f"{result['listings']:>10}{result['targets']:>10}  {result['method']:<14}{result['seconds'] * 1000:>10.2f}")
+    print("mask timings above 1000 targets are extrapolated from the first 1000")
+    return results
+
+
+if __name__ == "__main__":
+    main()
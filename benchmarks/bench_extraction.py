@@ -0,0 +1,82 @@
+"""
+Incremental in-browser extraction against page_source parsing
+
+    python -m benchmarks.bench_extraction [--cards 200 1000 5000] [--per-scroll 40] [--repeat 5]
+
+page_source mode transfers the whole page once scrolling stops and parses
+it with the default backend. Incremental mode transfers, after every
+scroll, the JSON the injected script returns for the cards it has not sent
+before, and decodes it with build_card. The JSON payloads are built here
+exactly as the script lays them out, from the synthetic page's cards, so
+no browser is needed.
+"""
+
+import argparse
+import json
+
+from browser_extract import IncrementalExtractor
+from html_parsers import ITEM_ID_PATTERN, SPAN_KINDS, extract_listing_cards
+from benchmarks.bench_parsers import time_call
+from benchmarks.synthetic import marketplace_page
+
+
+def script_payloads(html, per_scroll):
+    """The JSON strings the extraction script returns, one per scroll of per_scroll new cards"""
+    from selectolax.lexbor import LexborHTMLParser
+
+    cards = []
+    for link in LexborHTMLParser(html).css('a[href*="/marketplace/item/"]'):
+        spans = [[SPAN_KINDS[node.attributes['class']], node.text(deep=True).strip()]
+                 for node in link.css('span[class]') if node.attributes.get('class') in SPAN_KINDS]
+        cards.append([link.attributes.get('href'), spans])
+    return [json.dumps(cards[start:start + per_scroll]) for start in range(0, len(cards), per_scroll)]
+
+
+class ReplayDriver:
+    """Returns one recorded payload per extraction call"""
+
+    def __init__(self, payloads):
+        self.payloads = iter(payloads)
+
+    def execute_script(self, script, *args):
+        return next(self.payloads)
+
+
+def extract_incrementally(payloads):
+    extractor = IncrementalExtractor(ReplayDriver(payloads))
+    for _ in payloads:
+        extractor.collect()
+    return extractor.cards
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark incremental extraction against page_source parsing")
+    parser.add_argument('--cards', type=int, nargs='*', default=[200, 1000, 5000])
+    parser.add_argument('--per-scroll', type=int, default=40, help="New listings loaded by each scroll")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.cards:
+        html = marketplace_page(count)
+        payloads = script_payloads(html, args.per_scroll)
+
+        cards = extract_incrementally(payloads)
+        if cards != extract_listing_cards(html):
+            raise AssertionError("incremental cards differ from page_source cards")
+        if len({ITEM_ID_PATTERN.search(href).group(1) for payload in payloads for href, _ in json.loads(payload)}) != count:
+            raise AssertionError("a card was sent twice")
+
+        results.append({'cards': count, 'mode': 'page_source', 'kb': len(html) / 1024,
+                        'seconds': time_call(extract_listing_cards, html, repeat=args.repeat)})
+        results.append({'cards': count, 'mode': 'incremental', 'kb': sum(map(len, payloads)) / 1024,
+                        'seconds': time_call(extract_incrementally, payloads, repeat=args.repeat)})
+
+    print(f"{'cards':>8}  {'mode':<13}{'transferred':>14}{'parse ms':>10}")
+    for result in results:
+        print(f"{result['cards']:>8}  {result['mode']:<13}{result['kb']:>12.0f}KB{result['seconds'] * 1000:>10.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Vectorized listing normalization against the original per-title loop
+
+    python -m benchmarks.bench_normalize [--rows 10000 100000] [--repeat 3]
+
+Reports listings per second for both paths and checks they produce the
+same records.
+"""
+
+import argparse
+import re
+
+from normalize import normalize_listings
+from benchmarks.bench_parsers import time_call
+from benchmarks.synthetic import card_records
+
+
+def legacy_normalize(cards, make, model):
+    """The original main() loop: per-title regex searches and per-item conversions"""
+    vehicles_list = []
+    year_pattern = re.compile(r'\b(19[8-9]\d|20[0-2]\d|2025)\b')
+    for card in cards:
+        title_lower = card['title'].lower()
+        year_match = year_pattern.search(title_lower)
+        make_match = re.search(make.lower(), title_lower)
+        model_match = re.search(model.lower(), title_lower)
+        if not (year_match and make_match and model_match):
+            continue
+        mileage = card['mileage'] or "0K km"
+        if mileage.endswith('K km'):
+            mileage_km = int(mileage.replace('K km', '')) * 1000
+        else:
+            mileage_km = int(mileage.replace('K miles', '')) * 1609
+        vehicles_list.append({
+            'Year': int(year_match.group(0)),
+            'Make': make_match.group(0).capitalize(),
+            'Model': model_match.group(0).capitalize(),
+            'Price': int(re.sub(r'[^\d.]', '', card['price'])),
+            'Location': card['location'],
+            'Mileage': mileage_km,
+        })
+    return vehicles_list
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark listing normalization")
+    parser.add_argument('--rows', type=int, nargs='*', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        cards = card_records(rows)
+        expected = legacy_normalize(cards, 'toyota', 'corolla')
+        normalized = normalize_listings(cards, 'toyota', 'corolla').drop(columns='ItemId')
+        if normalized.to_dict('records') != expected:
+            raise AssertionError("Vectorized normalization disagrees with the original loop")
+
+        for path, function in [('legacy loop', legacy_normalize), ('vectorized', normalize_listings)]:
+            seconds = time_call(function, cards, 'toyota', 'corolla', repeat=args.repeat)
+            results.append({'rows': rows, 'path': path, 'seconds': seconds, 'rows_per_second': rows / seconds})
+
+    print(f"{'rows':>8}  {'path':<14}{'ms':>10}{'rows/s':>14}")
+    for result in results:
+        print(f"{result['rows']:>8}  {result['path']:<14}{result['seconds'] * 1000:>10.1f}{result['rows_per_second']:>14,.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
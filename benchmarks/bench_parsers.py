@@ -0,0 +1,104 @@
+"""
+Compare the HTML parser backends on saved and synthetic search pages
+
+    python -m benchmarks.bench_parsers [--fixtures DIR] [--cards 100 1000] [--repeat 5]
+                                       [--make Toyota] [--model Corolla]
+
+Saved pages (*.html or *.html.gz) in benchmarks/fixtures are benchmarked
+alongside synthetic pages. No saved page is checked in, so by default only
+the synthetic pages are covered; add anonymized pages to include real ones.
+Each backend runs html_parsers.extract_listing_cards, the card extraction the
+scraper uses, and must return the same card records as the BeautifulSoup
+fallback. The cards are then timed through normalize_listings for --make and
+--model, the rest of the path from page to listings.
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import time
+
+from html_parsers import available_backends, extract_listing_cards
+from normalize import normalize_listings
+from benchmarks.synthetic import marketplace_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Yield (name, html) for every saved page fixture"""
+    for path in sorted(glob.glob(os.path.join(directory, '*.html')) + glob.glob(os.path.join(directory, '*.html.gz'))):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            yield os.path.basename(path), f.read()
+
+
+def time_call(function, *args, repeat=5):
+    """Best wall time of repeat calls in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_page(name, html, backends, repeat=5, make='Toyota', model='Corolla'):
+    """Time extract_listing_cards with every backend on one page, then normalize_listings
+    on the cards; returns a list of result dictionaries"""
+    reference = extract_listing_cards(html, 'bs4') if 'bs4' in backends else None
+    results = []
+    for backend in backends:
+        cards = extract_listing_cards(html, backend)
+        if reference is not None and cards != reference:
+            raise AssertionError(f"{backend} disagrees with bs4 on {name}")
+        seconds = time_call(extract_listing_cards, html, backend, repeat=repeat)
+        results.append({
+            'page': name,
+            'backend': backend,
+            'page_kb': round(len(html) / 1024),
+            'records': len(cards),
+            'seconds': seconds,
+        })
+
+    listings = len(normalize_listings(cards, make, model))
+    results.append({
+        'page': name,
+        'backend': 'normalize',
+        'page_kb': round(len(html) / 1024),
+        'records': listings,
+        'seconds': time_call(normalize_listings, cards, make, model, repeat=repeat),
+    })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="Directory of saved search pages")
+    parser.add_argument('--cards', type=int, nargs='*', default=[100, 1000], help="Synthetic page sizes")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--make', default='Toyota', help="Make the saved pages were searched for")
+    parser.add_argument('--model', default='Corolla', help="Model the saved pages were searched for")
+    args = parser.parse_args(argv)
+
+    backends = available_backends()
+    pages = list(load_fixtures(args.fixtures))
+    if not pages:
+        print(f"No saved pages in {args.fixtures}; benchmarking synthetic pages only")
+    pages += [(f"synthetic-{count}", marketplace_page(count, make=args.make, model=args.model))
+              for count in args.cards]
+
+    results = []
+    for name, html in pages:
+        results.extend(bench_page(name, html, backends, args.repeat, args.make, args.model))
+
+    print(f"{'page':<24}{'backend':<12}{'size':>10}{'records':>9}{'ms':>10}")
+    for result in results:
+        print(f"{result['page']:<24}{result['backend']:<12}{result['page_kb']:>8}KB"
+              f"{result['records']:>9}{result['seconds'] * 1000:>10.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
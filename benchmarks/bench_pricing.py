@@ -0,0 +1,103 @@
+"""
+Fit and batch-predict the multi-feature pricing model
+
+    python -m benchmarks.bench_pricing [--listings 2000] [--targets 100000] [--repeat 5]
+
+Listings are generated with known mileage, year, city and transmission
+effects. Reports the fit time, predictions per second for one vectorized
+call over every target against predicting the targets one at a time, and
+the hold-out error of the pricing model next to the mileage-only regression.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from pricing_model import PricingModel
+from regression import RunningRegression
+from benchmarks.bench_parsers import time_call
+from benchmarks.synthetic import CITIES
+
+CITY_EFFECTS = dict(zip(CITIES, [0, 300, -800, 2500, 2000, 200, -400, -1200]))
+TRANSMISSION_EFFECTS = {'automatic': 0, 'manual': -900}
+
+
+def vehicles(count, seed=0):
+    """Listings of one generation (2009-2013) with known price effects"""
+    rng = np.random.default_rng(seed)
+    mileages = rng.integers(20, 330, count) * 1000
+    years = rng.integers(2009, 2014, count)
+    locations = rng.choice(CITIES, count)
+    transmissions = rng.choice(list(TRANSMISSION_EFFECTS), count, p=[0.8, 0.2])
+    prices = (16_000 - 0.035 * mileages + 700 * (years - 2009)
+              + np.array([CITY_EFFECTS[city] for city in locations])
+              + np.array([TRANSMISSION_EFFECTS[t] for t in transmissions])
+              + rng.normal(0, 900, count))
+    return pd.DataFrame({
+        'Year': years,
+        'Price': np.maximum(500, prices).astype(np.int64),
+        'Location': locations,
+        'Mileage': mileages,
+        'Transmission': transmissions,
+    })
+
+
+def predict_batch(model, targets):
+    return model.predict(targets['Mileage'].to_numpy(), targets['Year'].to_numpy(),
+                         targets['Location'].to_numpy(), targets['Transmission'].to_numpy())
+
+
+def predict_one_by_one(model, targets):
+    return [model.predict(mileage, year, location, transmission)
+            for mileage, year, location, transmission
+            in targets[['Mileage', 'Year', 'Location', 'Transmission']].itertuples(index=False, name=None)]
+
+
+def rmse(predicted, actual):
+    return float(np.sqrt(np.mean((np.asarray(predicted) - actual) ** 2)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the multi-feature pricing model")
+    parser.add_argument('--listings', type=int, default=2000, help="Listings in the fitted scrape")
+    parser.add_argument('--targets', type=int, default=100_000, help="Target vehicles per batch")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    listings = vehicles(args.listings)
+    targets = vehicles(args.targets, seed=1)
+
+    model = PricingModel().fit(listings)
+    fit_seconds = time_call(lambda: PricingModel().fit(listings), repeat=args.repeat)
+    batch_seconds = time_call(predict_batch, model, targets, repeat=args.repeat)
+
+    # Predicting every target one at a time is slow, so time a sample and scale it up
+    sample = targets.iloc[:min(2000, args.targets)]
+    single_seconds = time_call(predict_one_by_one, model, sample, repeat=1) * args.targets / len(sample)
+
+    batch = predict_batch(model, targets)
+    if not np.allclose(batch[:len(sample)], predict_one_by_one(model, sample)):
+        raise AssertionError("batch and single predictions differ")
+
+    mileage_only = RunningRegression.from_arrays(listings['Mileage'].to_numpy(), listings['Price'].to_numpy())
+    results = [
+        {'step': 'fit', 'targets': 0, 'seconds': fit_seconds},
+        {'step': 'predict batch', 'targets': args.targets, 'seconds': batch_seconds},
+        {'step': 'predict one by one', 'targets': args.targets, 'seconds': single_seconds},
+    ]
+
+    print(f"{'step':<22}{'targets':>10}{'ms':>12}{'predictions/s':>16}")
+    for result in results:
+        rate = f"{result['targets'] / result['seconds']:,.0f}" if result['targets'] else ''
+        print(f"{result['step']:<22}{result['targets']:>10}{result['seconds'] * 1000:>12.2f}{rate:>16}")
+
+    print(f"\nHold-out RMSE: pricing model ${rmse(batch, targets['Price']):,.0f}, "
+          f"mileage-only ${rmse(mileage_only.predict(targets['Mileage'].to_numpy()), targets['Price']):,.0f}")
+    for name, coef in model.coefficients().items():
+        print(f"    {name:<28}{coef:>12.3f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
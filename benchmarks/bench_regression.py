@@ -0,0 +1,108 @@
+"""
+Check the running regression against scikit-learn and time both
+
+    python -m benchmarks.bench_regression [--sizes 10 100 1000 100000] [--repeat 20]
+
+scikit-learn is only needed here, as the reference. Parity is checked on
+random listings, on listings that all share one mileage, and after
+incrementally adding and expiring listings. Timings cover one fit plus one
+prediction, which is what a valuation does.
+"""
+
+import argparse
+
+import numpy as np
+
+from regression import RunningRegression
+from benchmarks.bench_parsers import time_call
+
+RELATIVE_TOLERANCE = 1e-9
+
+
+def listings(count, seed=0):
+    """Synthetic (mileages, prices) with a depreciation trend and noise"""
+    rng = np.random.default_rng(seed)
+    mileages = rng.integers(5_000, 350_000, count)
+    prices = np.maximum(500, 22_000 - 0.05 * mileages + rng.normal(0, 1_500, count)).astype(np.int64)
+    return mileages, prices
+
+
+def sklearn_fit(mileages, prices):
+    from sklearn.linear_model import LinearRegression
+
+    return LinearRegression().fit(mileages.reshape(-1, 1), prices)
+
+
+def assert_close(name, actual, expected):
+    scale = max(1.0, abs(expected))
+    if abs(actual - expected) > RELATIVE_TOLERANCE * scale:
+        raise AssertionError(f"{name}: {actual!r} != sklearn {expected!r}")
+
+
+def check_parity(mileages, prices, regression, label):
+    """Compare slope, intercept and predictions with sklearn on the same listings"""
+    reference = sklearn_fit(mileages, prices)
+    assert_close(f"{label} slope", regression.slope, reference.coef_[0])
+    assert_close(f"{label} intercept", regression.intercept, reference.intercept_)
+    targets = np.array([0, 50_000, 150_000, 400_000])
+    for target, expected in zip(targets, reference.predict(targets.reshape(-1, 1))):
+        assert_close(f"{label} predict({target})", regression.predict(target), expected)
+
+    residuals = prices - reference.predict(mileages.reshape(-1, 1))
+    if len(prices) > 2:
+        assert_close(f"{label} residual_std", regression.residual_std,
+                     float(np.sqrt(np.dot(residuals, residuals) / (len(prices) - 2))))
+
+
+def run_parity_checks(sizes):
+    for count in sizes:
+        mileages, prices = listings(count)
+        check_parity(mileages, prices, RunningRegression.from_arrays(mileages, prices), f"n={count}")
+
+    mileages, prices = listings(50, seed=1)
+    same_mileage = np.full(50, 120_000)
+    check_parity(same_mileage, prices, RunningRegression.from_arrays(same_mileage, prices), "same mileage")
+
+    # Listings arrive one at a time, then the oldest half expires
+    regression = RunningRegression()
+    for mileage, price in zip(mileages, prices):
+        regression.add(mileage, price)
+    regression.remove_many(mileages[:25], prices[:25])
+    check_parity(mileages[25:], prices[25:], regression, "incremental")
+
+
+def fit_and_predict_running(mileages, prices):
+    return RunningRegression.from_arrays(mileages, prices).predict(150_000)
+
+
+def fit_and_predict_sklearn(mileages, prices):
+    return sklearn_fit(mileages, prices).predict(np.array([[150_000]]))[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the running regression with scikit-learn")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10, 100, 1000, 100_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    run_parity_checks(args.sizes)
+    print("Parity with scikit-learn: ok")
+
+    results = []
+    for count in args.sizes:
+        mileages, prices = listings(count)
+        for name, function in (('running', fit_and_predict_running), ('sklearn', fit_and_predict_sklearn)):
+            results.append({
+                'listings': count,
+                'engine': name,
+                'seconds': time_call(function, mileages, prices, repeat=args.repeat),
+            })
+
+    print(f"{'listings':>10}  {'engine':<10}{'us':>12}")
+    for result in results:
+        print(f"{result['listings']:>10}  {result['engine']:<10}{result['seconds'] * 1e6:>12.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
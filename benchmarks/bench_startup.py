@@ -0,0 +1,119 @@
+"""
+Check startup time against budgets for the two interactive entry points
+
+    python -m benchmarks.bench_startup [--repeat 5] [--top 8]
+
+- ui_visible: python main.py up to the input window being drawn. Without a
+  display the window step is skipped and only the imports are timed.
+- prompt_examples: a full run of prompt_examples.py
+
+Each scenario runs in a fresh interpreter; the best wall time of --repeat
+runs is compared with its budget. One extra run under `python -X importtime`
+lists the slowest top-level imports and any heavy dependency that was
+loaded although the scenario never uses it. Exits with status 1 when a
+scenario is over budget or loads a heavy dependency.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that belong to the scrape, model and LLM stages, never to startup
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'bs4', 'lxml', 'selectolax', 'pandas', 'numpy',
+                 'matplotlib', 'sklearn', 'groq', 'httpx')
+
+UI_VISIBLE_SCRIPT = """
+import main
+import tkinter as tk
+from ui import VehicleUI
+try:
+    root = tk.Tk()
+except tk.TclError:
+    print("no display: imports only")
+else:
+    VehicleUI(root)
+    root.update()
+    root.destroy()
+"""
+
+# name -> (command arguments after the interpreter, budget in seconds)
+SCENARIOS = {
+    'ui_visible': (['-c', UI_VISIBLE_SCRIPT], 1.0),
+    'prompt_examples': (['prompt_examples.py'], 0.5),
+}
+
+
+def run_python(args, importtime=False):
+    """Run the interpreter on args from the project root; returns (seconds, stdout, stderr)"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stderr[-2000:]}")
+    return seconds, completed.stdout, completed.stderr
+
+
+def parse_importtime(stderr):
+    """(module, cumulative seconds, depth) for every line of -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(cumulative) / 1e6, depth))
+    return imports
+
+
+def bench_scenario(name, args, budget, repeat=5, top=8):
+    """Time one scenario and break down its imports; returns a result dictionary"""
+    best = min(run_python(args)[0] for _ in range(repeat))
+    _, stdout, stderr = run_python(args, importtime=True)
+    imports = parse_importtime(stderr)
+
+    top_level = sorted((item for item in imports if item[2] == 0), key=lambda item: -item[1])
+    loaded = {module.split('.')[0] for module, _, _ in imports}
+    return {
+        'scenario': name,
+        'seconds': best,
+        'budget': budget,
+        'within_budget': best <= budget,
+        'import_seconds': sum(seconds for _, seconds, depth in imports if depth == 0),
+        'slowest_imports': [(module, seconds) for module, seconds, _ in top_level[:top]],
+        'heavy_modules': sorted(loaded.intersection(HEAVY_MODULES)),
+        'display': 'no display' not in stdout,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark startup time against budgets")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="Slowest top-level imports to list")
+    args = parser.parse_args(argv)
+
+    results = [bench_scenario(name, command, budget, args.repeat, args.top)
+               for name, (command, budget) in SCENARIOS.items()]
+
+    print(f"{'scenario':<18}{'ms':>10}{'budget':>10}{'imports':>10}  status")
+    for result in results:
+        status = "ok" if result['within_budget'] and not result['heavy_modules'] else "OVER"
+        if not result['display']:
+            status += " (no display, window not drawn)"
+        print(f"{result['scenario']:<18}{result['seconds'] * 1000:>10.1f}{result['budget'] * 1000:>10.0f}"
+              f"{result['import_seconds'] * 1000:>10.1f}  {status}")
+        for module, seconds in result['slowest_imports']:
+            print(f"    {module:<32}{seconds * 1000:>8.1f} ms")
+        if result['heavy_modules']:
+            print(f"    heavy modules loaded: {', '.join(result['heavy_modules'])}")
+    return results
+
+
+if __name__ == "__main__":
+    results = main()
+    if not all(result['within_budget'] and not result['heavy_modules'] for result in results):
+        sys.exit(1)
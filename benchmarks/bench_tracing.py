@@ -0,0 +1,57 @@
+"""
+Cost of the tracing spans, disabled and enabled
+
+    python -m benchmarks.bench_tracing [--spans 100000] [--repeat 5]
+
+Times opening and closing a span with two attributes, with tracing off and
+with spans written to a temporary file, against an empty loop. A valuation
+opens about twenty spans, so the per-span cost times twenty is what tracing
+adds to each one.
+"""
+
+import argparse
+import os
+import tempfile
+
+import tracing
+from tracing import span
+from benchmarks.bench_parsers import time_call
+
+SPANS_PER_VALUATION = 20
+
+
+def empty_loop(count):
+    for index in range(count):
+        pass
+
+
+def open_spans(count):
+    for index in range(count):
+        with span('stage', index=index) as stage_span:
+            stage_span.set(listings=index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cost of tracing spans")
+    parser.add_argument('--spans', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    baseline = time_call(empty_loop, args.spans, repeat=args.repeat)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, path in (('disabled', ''), ('enabled', os.path.join(directory, 'trace.jsonl'))):
+            tracing.configure(path)
+            seconds = time_call(open_spans, args.spans, repeat=args.repeat) - baseline
+            results.append({'mode': mode, 'spans': args.spans, 'ns_per_span': seconds / args.spans * 1e9})
+        tracing.configure('')
+
+    print(f"{'mode':<10}{'ns/span':>10}{'us/valuation':>14}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['ns_per_span']:>10.0f}"
+              f"{result['ns_per_span'] * SPANS_PER_VALUATION / 1000:>14.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
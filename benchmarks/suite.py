@@ -0,0 +1,168 @@
+"""
+Benchmark every valuation stage at 1k to 1M synthetic listings
+
+    python -m benchmarks.suite [--rows 1000 10000 100000 1000000] [--stages parse normalize ...]
+                               [--repeat 3] [-o suite_results.json] [--baseline OLD.json]
+
+One synthetic listing set per size runs through the stages in pipeline
+order: card extraction from a search page, title/price/mileage
+normalization, cleaning, generation-range filtering, the mileage
+regression, the comparables index, the multi-feature pricing model and
+building one price-analysis prompt per listing. Parsing and prompt building
+stop at MAX_ROWS[stage] since a 1M-card page or a million prompts say
+nothing new. Results, with the Python, library and parser versions, are
+written as JSON; --baseline prints the speedup against an earlier file.
+"""
+
+import argparse
+import importlib.metadata
+import json
+import platform
+import sys
+import time
+
+from html_parsers import default_backend, extract_listing_cards
+from normalize import normalize_listings
+from cleaning import clean_listings
+from main import filter_generation, fit_price_model, fit_pricing_model, build_comparables
+from prompt_engineering import PromptEngineering
+from benchmarks.bench_parsers import time_call
+from benchmarks.synthetic import card_records, marketplace_page
+
+STAGES = ['parse', 'normalize', 'clean', 'generation_filter', 'regression', 'comparables',
+          'pricing_model', 'build_prompt']
+
+# Larger sizes are skipped for these stages
+MAX_ROWS = {'parse': 100_000, 'build_prompt': 100_000}
+
+MAKE, MODEL = 'Toyota', 'Corolla'
+GENERATION_RANGE = (2014, 2019)
+# Targets priced per size by the comparables and pricing stages
+PREDICTION_TARGETS = 1000
+
+VERSIONED_PACKAGES = ['numpy', 'pandas', 'selectolax', 'lxml', 'beautifulsoup4']
+
+
+def environment():
+    """Interpreter, platform and library versions the results were measured with"""
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parser_backend': default_backend(),
+        'packages': versions,
+    }
+
+
+def regression_step(vehicle_df, targets):
+    return fit_price_model(vehicle_df).predict(targets)
+
+
+def comparables_step(vehicle_df, targets):
+    return build_comparables(vehicle_df).comparable_prices(targets)
+
+
+def pricing_step(vehicle_df, targets):
+    return fit_pricing_model(vehicle_df).predict(targets, 2017, 'Calgary, AB')
+
+
+def build_prompts(prompt_engineer, vehicle_df):
+    years = vehicle_df['Year'].tolist()
+    mileages = vehicle_df['Mileage'].tolist()
+    locations = vehicle_df['Location'].tolist()
+    return [prompt_engineer.get_price_analysis_prompt(MAKE, MODEL, year, mileage, location)
+            for year, mileage, location in zip(years, mileages, locations)]
+
+
+def bench_size(rows, stages, repeat):
+    """Run the stages on one synthetic listing set; returns a list of result dictionaries"""
+    cards = card_records(rows, make=MAKE, model=MODEL)
+    vehicle_df = normalize_listings(cards, MAKE, MODEL)
+    cleaned_df, _ = clean_listings(vehicle_df)
+    generation_df = filter_generation(cleaned_df, *GENERATION_RANGE)
+    targets = generation_df['Mileage'].to_numpy()[:PREDICTION_TARGETS]
+
+    steps = {
+        'normalize': (normalize_listings, (cards, MAKE, MODEL), rows),
+        'clean': (clean_listings, (vehicle_df,), len(vehicle_df)),
+        'generation_filter': (filter_generation, (cleaned_df, *GENERATION_RANGE), len(cleaned_df)),
+        'regression': (regression_step, (generation_df, targets), len(generation_df)),
+        'comparables': (comparables_step, (generation_df, targets), len(generation_df)),
+        'pricing_model': (pricing_step, (generation_df, targets), len(generation_df)),
+        'build_prompt': (build_prompts, (PromptEngineering(), cleaned_df), len(cleaned_df)),
+    }
+
+    results = []
+    for stage in stages:
+        if rows > MAX_ROWS.get(stage, rows):
+            continue
+        if stage == 'parse':
+            html = marketplace_page(rows, make=MAKE, model=MODEL, script_kb=64)
+            function, args, stage_rows = extract_listing_cards, (html,), rows
+        else:
+            function, args, stage_rows = steps[stage]
+        seconds = time_call(function, *args, repeat=repeat)
+        results.append({
+            'stage': stage,
+            'rows': rows,
+            'stage_rows': stage_rows,
+            'seconds': seconds,
+            'ns_per_row': seconds / max(stage_rows, 1) * 1e9,
+        })
+        print(f"  {stage:<18}{stage_rows:>10}{seconds * 1000:>12.2f}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline_path):
+    """Print the speedup of each (stage, rows) over the same entry in a baseline file"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(result['stage'], result['rows']): result['seconds'] for result in json.load(f)['results']}
+    print(f"{'stage':<18}{'rows':>10}{'baseline ms':>14}{'ms':>10}{'speedup':>9}")
+    for result in results:
+        before = baseline.get((result['stage'], result['rows']))
+        if before is None:
+            continue
+        print(f"{result['stage']:<18}{result['rows']:>10}{before * 1000:>14.2f}"
+              f"{result['seconds'] * 1000:>10.2f}{before / result['seconds']:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every valuation stage on synthetic listings")
+    parser.add_argument('--rows', type=int, nargs='*', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--stages', nargs='*', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='suite_results.json', help="JSON file to write the results to")
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        print(f"{rows} listings", file=sys.stderr)
+        results.extend(bench_size(rows, args.stages, args.repeat))
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': environment(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<18}{'rows':>10}{'stage rows':>12}{'ms':>12}{'ns/row':>10}")
+    for result in results:
+        print(f"{result['stage']:<18}{result['rows']:>10}{result['stage_rows']:>12}"
+              f"{result['seconds'] * 1000:>12.2f}{result['ns_per_row']:>10.0f}")
+    print(f"Wrote {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Synthetic Marketplace data for the benchmarks
+Pages mimic the structure the scraper sees: large inline scripts, a login
+banner with content-class spans outside the feed, and one link per listing
+card wrapping the price, title, location and mileage spans.
+"""
+
+import json
+import random
+
+from html_parsers import TITLE_CLASS, PRICE_CLASS, CONTENT_CLASS
+
+MAKES_MODELS = [
+    ('Toyota', 'Corolla'), ('Honda', 'Civic'), ('Ford', 'F-150'),
+    ('Toyota', 'Camry'), ('Mazda', '3'), ('Hyundai', 'Elantra'),
+]
+CITIES = [
+    'Calgary, AB', 'Edmonton, AB', 'Red Deer, AB', 'Vancouver, BC',
+    'Toronto, ON', 'Airdrie, AB', 'Okotoks, AB', 'Lethbridge, AB',
+]
+TRIMS = ['', ' CE', ' LE', ' Sport', ' XLT', ' Touring']
+PLACEHOLDER_PRICES = [1, 12, 123, 1234, 12345]
+
+
+def card_record(index, rng, make='Toyota', model='Corolla'):
+    """One listing card record as returned by extract_listing_cards()"""
+    year = rng.randint(1998, 2024)
+    if rng.random() < 0.03:
+        price = rng.choice(PLACEHOLDER_PRICES)
+    else:
+        price = max(500, int(rng.gauss(30000 - (2024 - year) * 1200, 2500)))
+    if rng.random() < 0.05:
+        title = f"{make} {model} for parts"
+    else:
+        title = f"{year} {make} {model}{rng.choice(TRIMS)}"
+    unit = 'miles' if rng.random() < 0.1 else 'km'
+    return {
+        'item_id': str(100000000 + index),
+        'title': title,
+        'price': f"CA${price:,}",
+        'location': rng.choice(CITIES),
+        'mileage': f"{rng.randint(5, 400)}K {unit}" if rng.random() < 0.95 else None,
+    }
+
+
+def card_records(count, seed=0, make='Toyota', model='Corolla'):
+    """count listing card records"""
+    rng = random.Random(seed)
+    return [card_record(i, rng, make, model) for i in range(count)]
+
+
+def listing_card(index, rng, make='Toyota', model='Corolla'):
+    """HTML of one listing card with some of the noise seen on real pages"""
+    card = card_record(index, rng, make, model)
+    spans = (
+        f'<span class="{PRICE_CLASS}">{card["price"]}</span>'
+        f'<div class="x1gslohp"><span class="{TITLE_CLASS}"><span>{card["title"]}</span></span></div>'
+        f'<div class="x1iorvi4"><span class="{CONTENT_CLASS}">{card["location"]}</span></div>'
+    )
+    if card['mileage']:
+        spans += f'<div class="x1iorvi4"><span class="{CONTENT_CLASS}">{card["mileage"]}</span></div>'
+    return (
+        f'<div class="x9f619 x78zum5"><a class="x1i10hfl" href="/marketplace/item/{card["item_id"]}/" role="link">'
+        f'<div class="x1n2onr6"><img alt="{card["title"]}" src="https://scontent.example/{index}.jpg"></div>'
+        f'<div class="x1gslohp">{spans}</div></a></div>'
+    )
+
+
+def marketplace_page(card_count, seed=0, make='Toyota', model='Corolla', script_kb=512):
+    """A full search page with card_count listing cards"""
+    rng = random.Random(seed)
+    blob = json.dumps({'require': [['ScheduledServerJS', 'handle', None, [{'x': 'y' * 64}]]] * (script_kb * 16)})
+    cards = ''.join(listing_card(i, rng, make, model) for i in range(card_count))
+    return (
+        '<!DOCTYPE html><html><head><title>Marketplace</title>'
+        f'<script type="application/json">{blob}</script></head><body>'
+        f'<div role="banner"><span class="{CONTENT_CLASS}">Log In</span>'
+        f'<span class="{CONTENT_CLASS}">Create new account</span></div>'
+        f'<div role="main"><div aria-label="Collection of Marketplace items">{cards}</div></div>'
+        '</body></html>'
+    )
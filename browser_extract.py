@@ -0,0 +1,87 @@
+"""
+Incremental listing extraction inside the browser
+Instead of pulling the whole page_source across the WebDriver bridge and
+parsing it again after scrolling, a small injected script walks the listing
+cards in the page and returns compact JSON for the cards it has not
+returned before. The item ids already sent are kept in a Set on `window`,
+so each call transfers and parses only the listings added since the last
+one. Span texts are classified into card fields by html_parsers.build_card,
+exactly as the HTML parsers do.
+"""
+
+import json
+
+from html_parsers import SPAN_KINDS, build_card
+from scroller import LISTING_CARD_SELECTOR
+
+EXTRACTION_MODES = ('page_source', 'incremental')
+DEFAULT_EXTRACTION = 'page_source'
+
+SEEN_VARIABLE = '__autovaluateSeenListings'
+
+# arguments: card selector, {span class: kind}. Returns a JSON array of
+# [href, [[kind, text], ...]] for every card not returned before. A card is
+# only returned, and marked as seen, once its title (kind 0) and price
+# (kind 1) spans have rendered, so a card caught half-rendered is read again
+# on the next call instead of being lost.
+EXTRACT_NEW_CARDS_SCRIPT = """
+const seen = window[%(seen)r] || (window[%(seen)r] = new Set());
+const kinds = arguments[1];
+const cards = [];
+for (const link of document.querySelectorAll(arguments[0])) {
+    const href = link.getAttribute('href') || '';
+    const match = href.match(/\\/marketplace\\/item\\/(\\d+)/);
+    const key = match ? match[1] : href;
+    if (seen.has(key)) {
+        continue;
+    }
+    const spans = [];
+    let hasTitle = false;
+    let hasPrice = false;
+    for (const span of link.querySelectorAll('span[class]')) {
+        const kind = kinds[span.getAttribute('class')];
+        if (kind !== undefined) {
+            spans.push([kind, span.textContent.trim()]);
+            hasTitle = hasTitle || kind === 0;
+            hasPrice = hasPrice || kind === 1;
+        }
+    }
+    if (!hasTitle || !hasPrice) {
+        continue;
+    }
+    seen.add(key);
+    cards.push([href, spans]);
+}
+return JSON.stringify(cards);
+""" % {'seen': SEEN_VARIABLE}
+
+RESET_SCRIPT = "window[%r] = new Set();" % SEEN_VARIABLE
+
+
+class IncrementalExtractor:
+    """Collects listing cards from a live page, fetching only new cards on each call"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.cards = []
+        self.bytes_transferred = 0
+        self.calls = 0
+
+    def reset(self):
+        """Forget the cards already returned, e.g. after loading a new page"""
+        self.driver.execute_script(RESET_SCRIPT)
+        self.cards = []
+
+    def collect(self):
+        """Fetch the cards added since the last call; returns them as card records"""
+        payload = self.driver.execute_script(EXTRACT_NEW_CARDS_SCRIPT, LISTING_CARD_SELECTOR, SPAN_KINDS)
+        self.calls += 1
+        self.bytes_transferred += len(payload)
+        new_cards = [build_card(href, spans) for href, spans in json.loads(payload)]
+        self.cards.extend(new_cards)
+        return new_cards
+
+    def on_scroll(self, added, total):
+        """scroll_listings callback: collect after every scroll that loaded listings"""
+        if added > 0:
+            self.collect()
@@ -0,0 +1,117 @@
+"""
+Vectorized cleaning of normalized listings
+Each rule is a boolean mask over the whole DataFrame. The fixed rules drop
+placeholder prices, giveaway prices and listings without mileage. The
+robust rules then flag prices far from the other listings of the same
+model year (median absolute deviation or interquartile range) and listings
+whose price per km is implausibly low for their year, which catches "$1 call
+me" and lease-takeover prices that pass the fixed rules. Every rule runs as
+column operations and per-year groupby transforms, and clean_listings()
+reports how many rows each rule dropped.
+"""
+
+import numpy as np
+
+# Placeholder prices sellers use instead of a real asking price
+PLACEHOLDER_PRICES = [1, 12, 123, 1234, 12345, 123456, 1234567]
+
+# Scale that makes the median absolute deviation comparable to a standard deviation
+MAD_SCALE = 1.4826
+
+DEFAULT_RULES = {
+    'placeholder_prices': PLACEHOLDER_PRICES,
+    # Prices at or below this are dropped
+    'min_price': 200,
+    'drop_zero_mileage': True,
+    # 'mad', 'iqr' or None to keep price outliers
+    'price_outliers': 'mad',
+    'mad_threshold': 3.5,
+    'iqr_factor': 1.5,
+    # Years with fewer listings are not checked for outliers
+    'min_group_size': 5,
+    # Robust z-score limit for log(price per km) below the year's median, None to
+    # skip. Only cheap-per-km listings are dropped; a high price per km is just low mileage
+    'price_per_km_threshold': 3.5,
+    # Mileages below this count as this much when computing price per km
+    'min_mileage_km': 10000,
+}
+
+# Order of the rules in the drop report
+RULE_NAMES = ['placeholder_price', 'min_price', 'zero_mileage', 'price_outlier', 'price_per_km']
+
+
+def _group_stats(values, groups, min_group_size):
+    """Per-row group size, median and scaled MAD of values within their group"""
+    grouped = values.groupby(groups)
+    sizes = grouped.transform('size')
+    medians = grouped.transform('median')
+    mads = (values - medians).abs().groupby(groups).transform('median') * MAD_SCALE
+    return sizes >= min_group_size, medians, mads
+
+
+def mad_outliers(values, groups, threshold, min_group_size, low_only=False):
+    """Rows more than threshold scaled MADs from their group's median, or only
+    below it with low_only"""
+    checked, medians, mads = _group_stats(values, groups, min_group_size)
+    deviations = medians - values if low_only else (values - medians).abs()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = deviations / mads
+    # A zero MAD means most of the group shares one value; nothing is flagged
+    return checked & (mads > 0) & (scores > threshold)
+
+
+def iqr_outliers(values, groups, factor, min_group_size):
+    """Rows outside factor interquartile ranges of their group's quartiles"""
+    grouped = values.groupby(groups)
+    checked = grouped.transform('size') >= min_group_size
+    lower = grouped.transform('quantile', 0.25)
+    upper = grouped.transform('quantile', 0.75)
+    spread = upper - lower
+    outside = (values < lower - factor * spread) | (values > upper + factor * spread)
+    return checked & (spread > 0) & outside
+
+
+def clean_listings(vehicle_df, rules=None):
+    """Apply the cleaning rules to a Year/Price/Mileage DataFrame. Returns the kept
+    rows and a {rule: rows dropped} report; each row is charged to the first rule it fails."""
+    rules = dict(DEFAULT_RULES, **(rules or {}))
+    prices = vehicle_df['Price']
+    mileages = vehicle_df['Mileage']
+
+    failed = {
+        'placeholder_price': prices.isin(rules['placeholder_prices'] or []).to_numpy(),
+        'min_price': (prices <= rules['min_price']).to_numpy() if rules['min_price'] is not None
+        else np.zeros(len(vehicle_df), dtype=bool),
+        'zero_mileage': (mileages == 0).to_numpy() if rules['drop_zero_mileage']
+        else np.zeros(len(vehicle_df), dtype=bool),
+    }
+    dropped = np.zeros(len(vehicle_df), dtype=bool)
+    report = {}
+    for name in RULE_NAMES[:3]:
+        report[name] = int((failed[name] & ~dropped).sum())
+        dropped |= failed[name]
+
+    # Robust statistics are taken over the listings that passed the fixed rules,
+    # so placeholder prices do not drag the medians
+    kept = vehicle_df[~dropped]
+    years = kept['Year']
+    kept_prices = kept['Price'].astype(np.float64)
+    outliers = np.zeros(len(kept), dtype=bool)
+
+    method = rules['price_outliers']
+    if method == 'mad':
+        outliers = mad_outliers(kept_prices, years, rules['mad_threshold'], rules['min_group_size']).to_numpy()
+    elif method == 'iqr':
+        outliers = iqr_outliers(kept_prices, years, rules['iqr_factor'], rules['min_group_size']).to_numpy()
+    elif method is not None:
+        raise ValueError(f"Unknown price_outliers method: {method}")
+    report['price_outlier'] = int(outliers.sum())
+
+    per_km = np.zeros(len(kept), dtype=bool)
+    if rules['price_per_km_threshold'] is not None and len(kept):
+        log_price_per_km = np.log(kept_prices.clip(lower=1)) - np.log(kept['Mileage'].clip(lower=rules['min_mileage_km']))
+        per_km = mad_outliers(log_price_per_km, years, rules['price_per_km_threshold'],
+                              rules['min_group_size'], low_only=True).to_numpy() & ~outliers
+    report['price_per_km'] = int(per_km.sum())
+
+    return kept[~(outliers | per_km)], report
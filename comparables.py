@@ -0,0 +1,114 @@
+"""
+Mileage-sorted index of one generation's listings for comparable prices
+Listings are sorted by mileage once, with a prefix sum of their prices, so a
+±window query is two binary searches and a subtraction instead of a scan of
+every listing. Queries take an array of target mileages and are answered in
+one vectorized call. When a window holds too few listings, the k listings
+with the nearest mileage are used instead, and the answer says which method
+was used and how far from the target its farthest listing was.
+"""
+
+import numpy as np
+
+# Half-width of the mileage window used for comparable listings
+COMPARABLE_MILEAGE_WINDOW = 20000
+
+# Fewer listings than this in the window falls back to the nearest listings
+MIN_WINDOW_COMPARABLES = 3
+NEAREST_COMPARABLES = 5
+
+# How a comparable price was found
+WINDOW_METHOD = 'window'
+NEAREST_METHOD = 'nearest'
+
+
+def _as_targets(targets):
+    """Targets as a 1-d float array, and whether a scalar was passed"""
+    scalar = np.ndim(targets) == 0
+    return np.atleast_1d(np.asarray(targets, dtype=np.float64)), scalar
+
+
+class MileageIndex:
+    """Listings sorted by mileage with prefix sums of price"""
+
+    def __init__(self, mileages, prices):
+        mileages = np.asarray(mileages, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        order = np.argsort(mileages, kind='stable')
+        self.mileages = mileages[order]
+        self.prices = prices[order]
+        self._price_sums = np.concatenate(([0.0], np.cumsum(self.prices)))
+
+    @classmethod
+    def from_frame(cls, vehicle_df):
+        return cls(vehicle_df['Mileage'].to_numpy(), vehicle_df['Price'].to_numpy())
+
+    def __len__(self):
+        return len(self.mileages)
+
+    def window(self, targets, half_width=COMPARABLE_MILEAGE_WINDOW):
+        """(counts, mean prices) of listings within ±half_width of each target,
+        inclusive. The mean is NaN for an empty window."""
+        targets, scalar = _as_targets(targets)
+        lo = np.searchsorted(self.mileages, targets - half_width, side='left')
+        hi = np.searchsorted(self.mileages, targets + half_width, side='right')
+        counts = hi - lo
+        totals = self._price_sums[hi] - self._price_sums[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, totals / counts, np.nan)
+        if scalar:
+            return int(counts[0]), float(means[0])
+        return counts, means
+
+    def nearest(self, targets, k=NEAREST_COMPARABLES):
+        """(mean prices, largest mileage distance) of the k listings nearest each target.
+        All listings are used when there are fewer than k; NaN without listings."""
+        targets, scalar = _as_targets(targets)
+        k = min(k, len(self))
+        if k == 0:
+            means = np.full(len(targets), np.nan)
+            distances = np.full(len(targets), np.nan)
+        else:
+            # The k nearest lie within k positions either side of the insertion point
+            positions = np.searchsorted(self.mileages, targets)
+            candidates = positions[:, None] + np.arange(-k, k)
+            valid = (candidates >= 0) & (candidates < len(self))
+            candidates = np.clip(candidates, 0, len(self) - 1)
+            candidate_distances = np.where(valid, np.abs(self.mileages[candidates] - targets[:, None]), np.inf)
+
+            chosen = np.argpartition(candidate_distances, k - 1, axis=1)[:, :k]
+            rows = np.arange(len(targets))[:, None]
+            means = self.prices[candidates[rows, chosen]].mean(axis=1)
+            distances = candidate_distances[rows, chosen].max(axis=1)
+        if scalar:
+            return float(means[0]), float(distances[0])
+        return means, distances
+
+    def comparable_prices(self, targets, half_width=COMPARABLE_MILEAGE_WINDOW,
+                          min_count=MIN_WINDOW_COMPARABLES, k=NEAREST_COMPARABLES):
+        """Mean comparable price per target: the ±half_width window, or the k
+        nearest listings where the window holds fewer than min_count"""
+        return self.comparables(targets, half_width, min_count, k)[0]
+
+    def comparables(self, targets, half_width=COMPARABLE_MILEAGE_WINDOW,
+                    min_count=MIN_WINDOW_COMPARABLES, k=NEAREST_COMPARABLES):
+        """(mean prices, methods, largest mileage distances) per target. The method is
+        WINDOW_METHOD, or NEAREST_METHOD where the window holds fewer than min_count"""
+        targets, scalar = _as_targets(targets)
+        lo = np.searchsorted(self.mileages, targets - half_width, side='left')
+        hi = np.searchsorted(self.mileages, targets + half_width, side='right')
+        counts, means = self.window(targets, half_width)
+        # The farthest listing in a window is one of its two ends
+        in_window = counts > 0
+        distances = np.full(len(targets), np.nan)
+        distances[in_window] = np.maximum(targets[in_window] - self.mileages[lo[in_window]],
+                                          self.mileages[hi[in_window] - 1] - targets[in_window])
+        methods = np.full(len(targets), WINDOW_METHOD, dtype=object)
+        sparse = counts < min_count
+        if sparse.any():
+            means = means.copy()
+            means[sparse], distances[sparse] = self.nearest(targets[sparse], k)
+            methods[sparse] = NEAREST_METHOD
+        if scalar:
+            return float(means[0]), methods[0], float(distances[0])
+        return means, methods, distances
@@ -0,0 +1,196 @@
+"""
+Warm headless Chrome drivers for AutoValuate
+Drivers are started once, handed out per search and returned afterwards.
+A driver is recycled after a number of pages or when its browser processes
+use too much memory, and the resolved chromedriver path is cached on disk so
+later startups never need the network.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from tracing import span
+
+DRIVER_CACHE_FILE = 'driver_cache.json'
+
+
+def get_chromedriver_path(cache_file=DRIVER_CACHE_FILE):
+    """Return the chromedriver binary path, resolving it online only on a cache miss"""
+    try:
+        with open(cache_file, 'r') as f:
+            path = json.load(f).get('chromedriver_path')
+        if path and os.path.isfile(path):
+            return path
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+
+    try:
+        with open(cache_file, 'w') as f:
+            json.dump({'chromedriver_path': path}, f, indent=2)
+    except OSError as e:
+        print(f"Could not cache chromedriver path: {e}")
+    return path
+
+
+def create_driver(headless=True):
+    """Start a new Chrome WebDriver"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--start-maximized')
+    if headless:
+        options.add_argument('--headless=new')
+
+    service = Service(get_chromedriver_path())
+    return webdriver.Chrome(service=service, options=options)
+
+
+def driver_memory_mb(driver):
+    """Resident memory of the driver's chromedriver and browser processes, None if unknown"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        total = 0
+        for p in processes:
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+    except (AttributeError, psutil.Error):
+        return None
+
+
+class DriverPool:
+    """A bounded pool of warm WebDrivers with page- and memory-based recycling"""
+
+    def __init__(self, size=2, max_pages=50, max_memory_mb=1500, headless=True):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.headless = headless
+
+        # Idle drivers, most recently used last; the condition guards the idle
+        # list and _created and wakes waiters when a driver or a slot frees up
+        self._idle = []
+        self._pages = {}
+        self._created = 0
+        self._available = threading.Condition()
+        self._closed = False
+
+    def ensure_size(self, size):
+        """Allow at least `size` drivers at once, e.g. for concurrent searches"""
+        with self._available:
+            self.size = max(self.size, size)
+            self._available.notify_all()
+
+    def acquire(self, timeout=None):
+        """Take a warm driver, starting one if the pool is not full yet. Waits up to
+        timeout seconds (forever when None) for a driver or a free slot."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No WebDriver became available in time")
+                self._available.wait(remaining)
+
+        try:
+            driver = create_driver(self.headless)
+        except Exception:
+            self._free_slot()
+            raise
+        self._pages[id(driver)] = 0
+        return driver
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def release(self, driver, pages=1):
+        """Return a driver after it loaded `pages` pages, recycling it when worn out"""
+        self._pages[id(driver)] = self._pages.get(id(driver), 0) + pages
+
+        if self._closed or self._needs_recycling(driver):
+            self.discard(driver)
+        else:
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
+
+    def discard(self, driver):
+        """Quit a driver and free its slot in the pool, so a waiter can start a replacement"""
+        self._pages.pop(id(driver), None)
+        self._free_slot()
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error closing WebDriver: {e}")
+
+    def _needs_recycling(self, driver):
+        if self.max_pages and self._pages[id(driver)] >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            memory = driver_memory_mb(driver)
+            if memory is not None and memory > self.max_memory_mb:
+                return True
+        return False
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Borrow a driver for one search; a driver that raised is not reused"""
+        with span('driver.acquire') as acquire_span:
+            driver = self.acquire(timeout)
+            # Only a driver started for this search has loaded no pages yet
+            acquire_span.set(started_driver=self._pages.get(id(driver)) == 0)
+        try:
+            yield driver
+        except Exception:
+            self.discard(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """Quit every idle driver; drivers still in use are quit when released"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for driver in idle:
+            self.discard(driver)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-city / multi-query scraping for AutoValuate
+Runs many (city, make, model, transmission) searches at once, each in its
+own headless Chrome process borrowed from the driver pool, with a cap on
+how many run concurrently. The listings of every search are merged into one
+DataFrame tagged with the city and query they came from.
+
+    python fanout.py --cities calgary edmonton vancouver --query toyota corolla -o listings.csv
+
+Searches run on threads: the browsers are separate processes already and
+the threads mostly wait on them, so a process pool would only add pickling
+of the listings on the way back.
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from main import search_vehicles
+from driver_pool import get_driver_pool
+from scroller import DEFAULT_TARGET_COUNT, DEFAULT_TIME_BUDGET
+from browser_extract import DEFAULT_EXTRACTION, EXTRACTION_MODES
+
+DEFAULT_CONCURRENCY = 4
+
+
+def build_searches(cities, queries, transmission='automatic'):
+    """Every (city, make, model, transmission) combination of cities and (make, model) queries"""
+    return [(city, make, model, transmission) for city in cities for make, model in queries]
+
+
+def scrape_many(searches, max_concurrency=DEFAULT_CONCURRENCY, scroll_options=None, max_age=None,
+                cleaning_rules=None, extraction=DEFAULT_EXTRACTION):
+    """Run the searches concurrently and return (listings DataFrame, {search: error}).
+    Listings carry SourceCity and Query columns; a failed search does not stop the others."""
+    import pandas as pd
+    from normalize import LISTING_COLUMNS
+
+    searches = list(dict.fromkeys(searches))
+    max_concurrency = max(1, min(max_concurrency, len(searches) or 1))
+    # One browser per concurrent search
+    get_driver_pool().ensure_size(max_concurrency)
+
+    frames = []
+    errors = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='scrape') as executor:
+        futures = {
+            executor.submit(search_vehicles, *search, scroll_options=scroll_options, max_age=max_age,
+                            cleaning_rules=cleaning_rules, extraction=extraction): search
+            for search in searches
+        }
+        for future in as_completed(futures):
+            city, make, model, transmission = search = futures[future]
+            try:
+                vehicle_df = future.result()
+            except Exception as e:
+                print(f"Search for {make} {model} in {city} failed: {e}")
+                errors[search] = e
+                continue
+            frames.append(vehicle_df.assign(SourceCity=city, Query=f"{make} {model}", Transmission=transmission))
+
+    columns = LISTING_COLUMNS + ['SourceCity', 'Query', 'Transmission']
+    listings = pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+    print(f"Scraped {len(listings)} listings from {len(searches) - len(errors)}/{len(searches)} searches "
+          f"in {time.perf_counter() - start:.1f}s")
+    return listings, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape one or more vehicles across many cities at once")
+    parser.add_argument('--cities', nargs='+', required=True)
+    parser.add_argument('--query', nargs=2, action='append', metavar=('MAKE', 'MODEL'), required=True,
+                        help="Make and model to search for; repeat for several vehicles")
+    parser.add_argument('--transmission', default='automatic', choices=['automatic', 'manual'])
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="Searches (browsers) running at once")
+    parser.add_argument('-o', '--output', help="CSV file to write the merged listings to (default: stdout)")
+    parser.add_argument('--target-listings', type=int, default=DEFAULT_TARGET_COUNT,
+                        help="Stop scrolling once this many listings are loaded")
+    parser.add_argument('--scroll-budget', type=float, default=DEFAULT_TIME_BUDGET,
+                        help="Maximum seconds to spend scrolling each search")
+    parser.add_argument('--max-age', type=float, default=None,
+                        help="Reuse stored listings scraped less than this many seconds ago (0 always re-scrapes)")
+    parser.add_argument('--extraction', default=DEFAULT_EXTRACTION, choices=EXTRACTION_MODES,
+                        help="Parse page_source after scrolling, or collect new cards in the browser after each scroll")
+    args = parser.parse_args(argv)
+
+    searches = build_searches(args.cities, args.query, args.transmission)
+    scroll_options = {'target_count': args.target_listings, 'time_budget': args.scroll_budget}
+
+    # Keep progress messages out of the CSV when it goes to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        listings, errors = scrape_many(searches, args.concurrency, scroll_options, args.max_age,
+                                       extraction=args.extraction)
+
+    listings.to_csv(args.output or sys.stdout, index=False)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Local (make, model, year) -> generation range lookup
+Ranges come from the bundled generation_table.json and from LLM answers that
+were validated and saved to generation_cache.json, so the LLM is only asked
+about vehicles neither file knows.
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+
+GENERATION_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generation_table.json')
+GENERATION_CACHE_FILE = 'generation_cache.json'
+
+RANGE_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\s*(?:-|–|—|to)\s*(19\d{2}|20\d{2})\b')
+
+# Longest span accepted as a single generation
+MAX_GENERATION_YEARS = 15
+
+
+def vehicle_key(make, model):
+    """Case- and punctuation-insensitive (make, model) key, so "F-150" matches "f150" """
+    return (re.sub(r'[^a-z0-9]', '', str(make).lower()), re.sub(r'[^a-z0-9]', '', str(model).lower()))
+
+
+def parse_generation_range(text, year):
+    """Extract a plausible generation range containing year from an LLM answer"""
+    if not text:
+        return None
+    year = int(year)
+    for match in RANGE_PATTERN.finditer(text):
+        gen_start, gen_end = int(match.group(1)), int(match.group(2))
+        if gen_start <= year <= gen_end and gen_end - gen_start <= MAX_GENERATION_YEARS:
+            return gen_start, gen_end
+    return None
+
+
+def _load_ranges(path):
+    """Read a {make: {model: [[start, end], ...]}} file, {} if it is missing or invalid"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"Ignoring invalid generation file {path}: {e}")
+        return {}
+
+
+class GenerationCache:
+    """Sorted generation ranges per vehicle; a binary search finds the ranges
+    starting at or before a year, the latest of which containing it is returned"""
+
+    def __init__(self, table_file=GENERATION_TABLE_FILE, cache_file=GENERATION_CACHE_FILE):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._ranges = {}
+        self._learned = _load_ranges(cache_file)
+
+        for source in (_load_ranges(table_file), self._learned):
+            for make, models in source.items():
+                for model, ranges in models.items():
+                    for gen_start, gen_end in ranges:
+                        self._add(make, model, int(gen_start), int(gen_end))
+
+    def _add(self, make, model, gen_start, gen_end):
+        ranges = self._ranges.setdefault(vehicle_key(make, model), [])
+        if (gen_start, gen_end) not in ranges:
+            bisect.insort(ranges, (gen_start, gen_end))
+
+    def lookup(self, make, model, year):
+        """Generation (start, end) containing year, or None if unknown"""
+        ranges = self._ranges.get(vehicle_key(make, model))
+        if not ranges:
+            return None
+        year = int(year)
+        # Learned ranges can overlap the table's, so the range starting closest
+        # before year may end before it while an earlier one still covers it
+        index = bisect.bisect_right(ranges, (year, float('inf')))
+        for gen_start, gen_end in reversed(ranges[:index]):
+            if year <= gen_end:
+                return gen_start, gen_end
+        return None
+
+    def store(self, make, model, gen_start, gen_end):
+        """Remember a validated range and persist it to the cache file"""
+        with self._lock:
+            self._add(make, model, gen_start, gen_end)
+            models = self._learned.setdefault(str(make).lower(), {})
+            ranges = models.setdefault(str(model).lower(), [])
+            if [gen_start, gen_end] not in ranges:
+                ranges.append([gen_start, gen_end])
+                ranges.sort()
+
+            temp_file = self.cache_file + '.tmp'
+            try:
+                with open(temp_file, 'w') as f:
+                    json.dump(self._learned, f, indent=2)
+                os.replace(temp_file, self.cache_file)
+            except OSError as e:
+                print(f"Could not save generation cache: {e}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """Return the process-wide generation cache, loading it on first use"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GenerationCache()
+        return _default_cache
@@ -0,0 +1,172 @@
+"""
+Pluggable HTML parsing backends for the Marketplace search page
+extract_listing_cards() walks each listing card once and returns one record
+per card.
+
+- selectolax: C-backed lexbor parser, one pass over the card nodes
+- lxml: libxml2 parser with a streaming target that never builds a tree and
+  only collects text inside the listing cards
+- bs4: pure-Python BeautifulSoup fallback
+
+Backends are imported only when used so missing optional packages just make
+a backend unavailable.
+"""
+
+import importlib.util
+import re
+
+# Class strings of the listing spans on the Marketplace search page
+TITLE_CLASS = 'x1lliihq x6ikm8r x10wlt62 x1n2onr6'
+PRICE_CLASS = 'x193iq5w xeuugli x13faqbe x1vvkbs x1xmvt09 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x xudqn12 x676frb x1lkfr7t x1lbecb7 x1s688f xzsf02u'
+CONTENT_CLASS = 'x1lliihq x6ikm8r x10wlt62 x1n2onr6 xlyipyv xuxw1ft x1j85h84'
+
+SPAN_KINDS = {TITLE_CLASS: 0, PRICE_CLASS: 1, CONTENT_CLASS: 2}
+
+# Every listing card is a link to its item page
+CARD_HREF = '/marketplace/item/'
+ITEM_ID_PATTERN = re.compile(r'/marketplace/item/(\d+)')
+MILEAGE_PATTERN = re.compile(r'^\d+K (km|miles)$')
+LOCATION_PATTERN = re.compile(r'^[A-Za-z\s\-]+, [A-Z]{2}$')
+
+# Fastest first; the first installed backend is the default
+PARSER_BACKENDS = ('selectolax', 'lxml', 'bs4')
+
+_BACKEND_MODULES = {'selectolax': 'selectolax', 'lxml': 'lxml', 'bs4': 'bs4'}
+
+
+def available_backends():
+    """Names of the backends whose packages are installed"""
+    return [name for name in PARSER_BACKENDS if importlib.util.find_spec(_BACKEND_MODULES[name])]
+
+
+def default_backend():
+    backends = available_backends()
+    if not backends:
+        raise ImportError("No HTML parser installed; install selectolax, lxml or beautifulsoup4")
+    return backends[0]
+
+
+def build_card(href, spans):
+    """One listing record from a card's href and its (kind, text) spans"""
+    item_id = ITEM_ID_PATTERN.search(href or '')
+    card = {
+        'item_id': item_id.group(1) if item_id else None,
+        'title': None,
+        'price': None,
+        'location': None,
+        'mileage': None,
+    }
+    for kind, text in spans:
+        if kind == 0:
+            if card['title'] is None:
+                card['title'] = text
+        elif kind == 1:
+            if card['price'] is None:
+                card['price'] = text
+        elif MILEAGE_PATTERN.match(text):
+            if card['mileage'] is None:
+                card['mileage'] = text
+        elif LOCATION_PATTERN.match(text):
+            if card['location'] is None:
+                card['location'] = text
+    return card
+
+
+def _cards_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    cards = []
+    for link in LexborHTMLParser(html).css(f'a[href*="{CARD_HREF}"]'):
+        spans = []
+        for node in link.css('span[class]'):
+            kind = SPAN_KINDS.get(node.attributes.get('class'))
+            if kind is not None:
+                spans.append((kind, node.text(deep=True).strip()))
+        cards.append(build_card(link.attributes.get('href'), spans))
+    return cards
+
+
+class _CardCollector:
+    """lxml parser target that groups listing spans by the card link around them"""
+
+    def __init__(self):
+        self.cards = []
+        self.card_href = None
+        self.card_depth = 0
+        self.card_spans = []
+        self.kind = None
+        self.depth = 0
+        self.parts = []
+
+    def start(self, tag, attrib):
+        if self.card_href is not None:
+            self.card_depth += 1
+            if self.kind is not None:
+                self.depth += 1
+            elif tag == 'span':
+                kind = SPAN_KINDS.get(attrib.get('class'))
+                if kind is not None:
+                    self.kind = kind
+                    self.depth = 1
+                    self.parts = []
+        elif tag == 'a' and CARD_HREF in attrib.get('href', ''):
+            self.card_href = attrib['href']
+            self.card_depth = 1
+            self.card_spans = []
+
+    def end(self, tag):
+        if self.card_href is None:
+            return
+        if self.kind is not None:
+            self.depth -= 1
+            if self.depth == 0:
+                self.card_spans.append((self.kind, ''.join(self.parts).strip()))
+                self.kind = None
+        self.card_depth -= 1
+        if self.card_depth == 0:
+            self.cards.append(build_card(self.card_href, self.card_spans))
+            self.card_href = None
+
+    def data(self, data):
+        if self.kind is not None:
+            self.parts.append(data)
+
+    def close(self):
+        return self.cards
+
+
+def _cards_lxml(html):
+    from lxml import etree
+
+    parser = etree.HTMLParser(target=_CardCollector(), remove_comments=True)
+    return etree.fromstring(html, parser)
+
+
+def _cards_bs4(html):
+    from bs4 import BeautifulSoup as soup
+
+    # A SoupStrainer on the card links costs more than it saves with html.parser
+    soup_obj = soup(html, 'html.parser')
+
+    cards = []
+    for link in soup_obj.find_all('a', href=lambda href: href and CARD_HREF in href):
+        spans = []
+        for span in link.find_all('span', class_=True):
+            kind = SPAN_KINDS.get(' '.join(span['class']))
+            if kind is not None:
+                spans.append((kind, span.text.strip()))
+        cards.append(build_card(link.get('href'), spans))
+    return cards
+
+
+_CARD_EXTRACTORS = {'selectolax': _cards_selectolax, 'lxml': _cards_lxml, 'bs4': _cards_bs4}
+
+
+def extract_listing_cards(html, backend=None):
+    """Walk every listing card once and return one record per card with its
+    item_id, title, price, location and mileage texts (None when missing)"""
+    if backend is None:
+        backend = default_backend()
+    if backend not in _CARD_EXTRACTORS:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    return _CARD_EXTRACTORS[backend](html)
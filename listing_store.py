@@ -0,0 +1,261 @@
+"""
+Local SQLite store for scraped Marketplace listings
+Listings are keyed by their search (city, make, model, transmission) and
+Marketplace item id, and stamped with the time they were last seen. Searches scraped within the TTL
+are served straight from the store, and a refresh only merges new listings
+into what is already stored.
+
+Every listing the store inserts or expires is also added to or removed from
+its RegressionBook, so the price-on-mileage regression of a generation is
+kept current without refitting. When another process (the UI, batch.py or
+service.py sharing listings.db) changes the database, the book is cleared
+and regressions are refitted from the stored listings on their next use.
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+
+from normalize import LISTING_COLUMNS
+from regression import RegressionBook
+
+LISTING_STORE_FILE = 'listings.db'
+# Replayed searches are kept apart from live listings and forgotten on exit
+REPLAY_STORE_PATH = ':memory:'
+
+# Serve a search from the store if it was scraped less than this many seconds ago
+DEFAULT_TTL = 60 * 60
+# Forget listings that have not been seen in a scrape for this many seconds
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    city TEXT NOT NULL,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    transmission TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    PRIMARY KEY (city, make, model, transmission)
+);
+CREATE TABLE IF NOT EXISTS listings (
+    city TEXT NOT NULL,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    transmission TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    listing_make TEXT NOT NULL,
+    listing_model TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    mileage INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    scraped_at REAL NOT NULL,
+    PRIMARY KEY (city, make, model, transmission, item_id)
+);
+CREATE INDEX IF NOT EXISTS listings_by_search_year
+    ON listings (city, make, model, transmission, year);
+CREATE INDEX IF NOT EXISTS listings_by_scraped_at ON listings (scraped_at);
+"""
+
+
+def search_key(city, make, model, transmission):
+    """Normalized key of a Marketplace search"""
+    return (city.strip().lower(), make.strip().lower(), model.strip().lower(), transmission.strip().lower())
+
+
+def listing_id(item_id, year, price, location, mileage):
+    """Key of a listing within its search: the Marketplace item id, or its
+    contents for the rare card whose link has no id (None, or NaN in a DataFrame)"""
+    if item_id is not None and item_id == item_id:
+        return str(item_id)
+    return f"{year}|{price}|{location}|{mileage}"
+
+
+class ListingStore:
+    """Indexed listing cache with a freshness TTL and incremental merges"""
+
+    def __init__(self, path=LISTING_STORE_FILE, retention=DEFAULT_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.regressions = RegressionBook()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def scraped_at(self, city, make, model, transmission):
+        """Time of the last scrape of a search, or None if it was never scraped"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scraped_at FROM searches WHERE city=? AND make=? AND model=? AND transmission=?",
+                search_key(city, make, model, transmission)
+            ).fetchone()
+        return row[0] if row else None
+
+    def listing_version(self, city, make, model, transmission):
+        """(last scrape time, retained listing count) of a search. It changes whenever
+        the search's stored listings do, including merges by other processes."""
+        key = search_key(city, make, model, transmission)
+        with self._lock, self._conn:
+            self._expire_listings(time.time())
+            row = self._conn.execute(
+                "SELECT scraped_at FROM searches WHERE city=? AND make=? AND model=? AND transmission=?", key
+            ).fetchone()
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM listings WHERE city=? AND make=? AND model=? AND transmission=?", key
+            ).fetchone()[0]
+        return (row[0] if row else None), count
+
+    def is_fresh(self, city, make, model, transmission, ttl=DEFAULT_TTL):
+        """True if the search was scraped within the last ttl seconds"""
+        scraped_at = self.scraped_at(city, make, model, transmission)
+        return scraped_at is not None and time.time() - scraped_at < ttl
+
+    def get_listings(self, city, make, model, transmission):
+        """All retained listings of a search as a list of dictionaries"""
+        with self._lock, self._conn:
+            self._expire_listings(time.time())
+            rows = self._conn.execute(
+                "SELECT year, listing_make, listing_model, price, location, mileage, item_id FROM listings "
+                "WHERE city=? AND make=? AND model=? AND transmission=? ORDER BY first_seen, rowid",
+                search_key(city, make, model, transmission)
+            ).fetchall()
+        return [dict(zip(LISTING_COLUMNS, row)) for row in rows]
+
+    def get_fresh_listings(self, city, make, model, transmission, ttl=DEFAULT_TTL):
+        """Listings of a search scraped within ttl seconds, otherwise None"""
+        if not self.is_fresh(city, make, model, transmission, ttl):
+            return None
+        return self.get_listings(city, make, model, transmission)
+
+    def merge_listings(self, city, make, model, transmission, vehicle_df, scraped_at=None):
+        """Insert newly seen listings from vehicle_df, refresh known ones (a seller may
+        change the price or mileage of an item) and expire listings past the retention
+        period. Returns the number of new listings."""
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        key = search_key(city, make, model, transmission)
+        rows = [
+            (listing_id(item_id, year, price, location, mileage), int(year), vehicle_make, vehicle_model,
+             int(price), location, int(mileage))
+            for year, vehicle_make, vehicle_model, price, location, mileage, item_id
+            in vehicle_df[LISTING_COLUMNS].itertuples(index=False, name=None)
+        ]
+
+        # (year, mileage, price) added to and removed from the regressions
+        added = []
+        removed = []
+        new_listings = 0
+        with self._lock, self._conn:
+            self._sync_regressions()
+            for item_id, year, vehicle_make, vehicle_model, price, location, mileage in rows:
+                stored = self._conn.execute(
+                    "SELECT year, mileage, price, scraped_at FROM listings "
+                    "WHERE city=? AND make=? AND model=? AND transmission=? AND item_id=?",
+                    key + (item_id,)
+                ).fetchone()
+                if stored is None:
+                    self._conn.execute(
+                        "INSERT INTO listings (city, make, model, transmission, item_id, year, listing_make, "
+                        "listing_model, price, location, mileage, first_seen, scraped_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        key + (item_id, year, vehicle_make, vehicle_model, price, location, mileage,
+                               scraped_at, scraped_at)
+                    )
+                    added.append((year, mileage, price))
+                    new_listings += 1
+                elif stored[3] < scraped_at:
+                    self._conn.execute(
+                        "UPDATE listings SET year=?, listing_make=?, listing_model=?, price=?, location=?, "
+                        "mileage=?, scraped_at=? WHERE city=? AND make=? AND model=? AND transmission=? AND item_id=?",
+                        (year, vehicle_make, vehicle_model, price, location, mileage, scraped_at) + key + (item_id,)
+                    )
+                    if stored[:3] != (year, mileage, price):
+                        removed.append(stored[:3])
+                        added.append((year, mileage, price))
+            # Additions first, so a regression never has more points removed than it holds
+            for changes, apply in ((added, self.regressions.add_listings), (removed, self.regressions.remove_listings)):
+                if changes:
+                    apply(key, *zip(*changes))
+            self._conn.execute(
+                "INSERT INTO searches (city, make, model, transmission, scraped_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(city, make, model, transmission) DO UPDATE SET scraped_at=excluded.scraped_at",
+                key + (scraped_at,)
+            )
+            self._expire_listings(scraped_at)
+        return new_listings
+
+    def _expire_listings(self, now):
+        """Delete listings not seen in a scrape within the retention period and
+        remove them from the regressions. Runs inside the caller's transaction."""
+        self._sync_regressions()
+        cutoff = now - self.retention
+        expired = self._conn.execute(
+            "SELECT city, make, model, transmission, year, mileage, price FROM listings WHERE scraped_at<? "
+            "ORDER BY city, make, model, transmission",
+            (cutoff,)
+        ).fetchall()
+        if not expired:
+            return
+        self._conn.execute("DELETE FROM listings WHERE scraped_at<?", (cutoff,))
+        for key, group in itertools.groupby(expired, key=lambda row: row[:4]):
+            years, mileages, prices = zip(*(row[4:] for row in group))
+            self.regressions.remove_listings(key, years, mileages, prices)
+
+    def _sync_regressions(self):
+        """Clear the regressions if another connection changed the database since the
+        last check; this connection's own commits do not change PRAGMA data_version"""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self.regressions.clear()
+            self._data_version = data_version
+
+    def price_regression(self, city, make, model, transmission, generation_range):
+        """Snapshot of the running price-on-mileage regression over a search's retained
+        listings with a year in generation_range. The first request for a generation
+        fits it from the stored listings; merges and expiry keep it current after that."""
+        key = search_key(city, make, model, transmission)
+        with self._lock, self._conn:
+            self._expire_listings(time.time())
+            regression = self.regressions.get(key, generation_range)
+            if regression is None:
+                rows = self._conn.execute(
+                    "SELECT mileage, price FROM listings WHERE city=? AND make=? AND model=? AND transmission=? "
+                    "AND year BETWEEN ? AND ?",
+                    key + (int(generation_range[0]), int(generation_range[1]))
+                ).fetchall()
+                mileages, prices = zip(*rows) if rows else ((), ())
+                regression = self.regressions.fit(key, generation_range, mileages, prices)
+            return regression.copy()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_listing_store():
+    """Return the process-wide listing store, opening it on first use"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ListingStore()
+        return _default_store
+
+
+_replay_store = None
+
+
+def get_replay_store():
+    """Return the in-memory store used while searches are replayed"""
+    global _replay_store
+    with _default_store_lock:
+        if _replay_store is None:
+            _replay_store = ListingStore(REPLAY_STORE_PATH)
+        return _replay_store
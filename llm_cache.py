@@ -0,0 +1,133 @@
+"""
+Content-addressed cache of LLM responses
+Responses are keyed by a hash of the rendered system and user prompts, the
+model name, temperature and max_tokens. An in-memory LRU sits in front of an
+SQLite store; entries expire after a TTL and the store evicts its least
+recently used entries beyond a size limit. Calls with a temperature above
+the bypass threshold are never cached since their answers are meant to vary.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_FILE = 'llm_cache.db'
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 10000
+DEFAULT_BYPASS_TEMPERATURE = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_used_at ON responses (used_at);
+"""
+
+
+def cache_key(messages, model, temperature, max_tokens):
+    """sha256 of the prompts and sampling parameters"""
+    payload = json.dumps(
+        [[message['role'], message['content']] for message in messages] + [model, float(temperature), int(max_tokens)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-level (memory LRU, SQLite) response cache with TTL and size bounds"""
+
+    def __init__(self, path=LLM_CACHE_FILE, ttl=DEFAULT_TTL, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 disk_entries=DEFAULT_DISK_ENTRIES, bypass_temperature=DEFAULT_BYPASS_TEMPERATURE):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.bypass_temperature = bypass_temperature
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bypassed': 0, 'evicted': 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def bypasses(self, temperature):
+        """True if calls at this temperature should skip the cache"""
+        return self.bypass_temperature is not None and temperature > self.bypass_temperature
+
+    def get(self, key):
+        """Cached response for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key=? AND created_at>?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET used_at=? WHERE key=?", (now, key))
+            self._remember(key, row[0], row[1])
+            self._stats['disk_hits'] += 1
+            return row[0]
+
+    def put(self, key, response):
+        """Store a response in memory and on disk, evicting the oldest entries if full"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._conn.execute("DELETE FROM responses WHERE created_at<=?", (now - self.ttl,))
+                count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.disk_entries:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY used_at LIMIT ?)",
+                        (count - self.disk_entries,)
+                    )
+                    self._stats['evicted'] += count - self.disk_entries
+
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def stats(self):
+        """Hit, miss, bypass and eviction counters plus the hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            with self._conn:
+                self._conn.execute("DELETE FROM responses")
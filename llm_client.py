@@ -0,0 +1,276 @@
+"""
+Shared Groq client for AutoValuate
+One client keeps its HTTP connections alive across every LLM call in the
+process. Calls go through a token-bucket rate limiter sized to the API quota
+and are retried with jittered exponential backoff on rate limits, timeouts,
+connection errors and server errors. Completions are served from the
+response cache when an identical prompt was answered before, and can be
+streamed into a TextStream that a UI polls while the answer is generated.
+"""
+
+import contextvars
+import os
+import queue
+import random
+import threading
+import time
+
+from llm_cache import ResponseCache, cache_key
+from tracing import span
+
+LLM_MODEL = "llama3-8b-8192"
+
+# Groq's free tier allows 30 requests per minute for llama3-8b-8192
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_BURST = 5
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, if it said so"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error):
+    import groq
+
+    if isinstance(error, (groq.RateLimitError, groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+class LLMClient:
+    """Rate-limited, retrying wrapper around one pooled Groq client"""
+
+    def __init__(self, api_key=None, model=LLM_MODEL, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 burst=DEFAULT_BURST, max_retries=3, base_delay=0.5, max_delay=8.0, timeout=30.0,
+                 cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.model = model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst)
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'throttle_seconds': 0.0, 'failures': 0}
+
+    @property
+    def client(self):
+        """The Groq client, created on first use and shared by every thread"""
+        with self._client_lock:
+            if self._client is None:
+                import httpx
+                from groq import Groq
+
+                http_client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=120),
+                )
+                # Retries are handled here so they are rate limited and counted
+                self._client = Groq(api_key=self.api_key or os.getenv("API_KEY"), max_retries=0,
+                                    http_client=http_client)
+            return self._client
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        """Counters of requests, retries, throttled requests and failures so far"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None:
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        time.sleep(delay)
+
+    def create(self, messages, max_tokens, temperature, model=None, **kwargs):
+        """Rate-limited chat completion with retries; returns the raw response"""
+        attempt = 0
+        throttle_seconds = 0.0
+        with span('llm.request', stream=kwargs.get('stream', False)) as request_span:
+            while True:
+                waited = self.limiter.acquire()
+                if waited > 0:
+                    self._count('throttled')
+                    self._count('throttle_seconds', waited)
+                    throttle_seconds += waited
+
+                self._count('requests')
+                try:
+                    response = self.client.chat.completions.create(
+                        model=model or self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        **kwargs
+                    )
+                    request_span.set(attempts=attempt + 1, throttle_seconds=round(throttle_seconds, 3))
+                    return response
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        self._count('failures')
+                        request_span.set(attempts=attempt + 1, throttle_seconds=round(throttle_seconds, 3))
+                        raise
+                    self._count('retries')
+                    self._backoff(attempt, e)
+                    attempt += 1
+
+    def complete(self, messages, max_tokens, temperature, model=None, use_cache=True, valid=None):
+        """Chat completion text, stripped. Identical requests are answered from
+        the response cache unless use_cache is False or the temperature is too high.
+        With valid, only answers it accepts are cached or served from the cache."""
+        model = model or self.model
+        with span('llm.complete', model=model, max_tokens=max_tokens, temperature=temperature) as llm_span:
+            key = None
+            if self.cache is not None and use_cache:
+                if self.cache.bypasses(temperature):
+                    self.cache.record_bypass()
+                else:
+                    key = cache_key(messages, model, temperature, max_tokens)
+                    cached = self.cache.get(key)
+                    if cached is not None and (valid is None or valid(cached)):
+                        llm_span.set(cache_hit=True, response_chars=len(cached))
+                        return cached
+
+            response = self.create(messages, max_tokens, temperature, model)
+            text = response.choices[0].message.content.strip()
+            if key is not None and (valid is None or valid(text)):
+                self.cache.put(key, text)
+            usage = getattr(response, 'usage', None)
+            llm_span.set(cache_hit=False, response_chars=len(text),
+                         total_tokens=getattr(usage, 'total_tokens', None))
+            return text
+
+    def stream(self, messages, max_tokens, temperature, model=None, use_cache=True):
+        """Yield the completion text as it is generated. A cached answer is
+        yielded in one piece; a fully streamed answer is added to the cache."""
+        model = model or self.model
+        with span('llm.stream', model=model, max_tokens=max_tokens, temperature=temperature) as llm_span:
+            key = None
+            if self.cache is not None and use_cache:
+                if self.cache.bypasses(temperature):
+                    self.cache.record_bypass()
+                else:
+                    key = cache_key(messages, model, temperature, max_tokens)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        llm_span.set(cache_hit=True, response_chars=len(cached))
+                        yield cached
+                        return
+
+            parts = []
+            first_chunk_at = None
+            start = time.perf_counter()
+            for chunk in self.create(messages, max_tokens, temperature, model, stream=True):
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter() - start
+                    parts.append(text)
+                    yield text
+
+            if key is not None and parts:
+                self.cache.put(key, ''.join(parts).strip())
+            llm_span.set(cache_hit=False, response_chars=sum(map(len, parts)),
+                         first_chunk_ms=round(first_chunk_at * 1000, 1) if first_chunk_at is not None else None)
+
+
+class TextStream:
+    """Consumes a text stream on a background thread so a UI can poll it"""
+
+    def __init__(self, chunks, label="LLM response"):
+        self.label = label
+        self.error = None
+        self._chunks = chunks
+        self._parts = []
+        self._queue = queue.Queue()
+        self._done = threading.Event()
+        # Consume the stream inside the caller's trace
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name=f"stream-{label}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for chunk in self._chunks:
+                self._parts.append(chunk)
+                self._queue.put(chunk)
+        except Exception as e:
+            self.error = e
+            print(f"Error getting {self.label}: {e}")
+        finally:
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def drain(self):
+        """Chunks received since the last drain"""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except queue.Empty:
+                return chunks
+
+    def result(self, timeout=None):
+        """Wait for the stream to finish and return the full text, None if empty"""
+        self._done.wait(timeout)
+        text = ''.join(self._parts).strip()
+        return text or None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide LLM client"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient(cache=ResponseCache())
+        return _default_client
@@ -1,323 +1,497 @@
 # Import libraries and dependencies
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup as soup
-import re
-import pandas as pd
-import matplotlib.pyplot as plt
-import time
-from groq import Groq
+# Selenium, pandas, numpy, groq and Tkinter are imported inside
+# the stages that use them, so the UI opens before any of them are loaded
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from sklearn.linear_model import LinearRegression
-import numpy as np
-from ui import run_ui, show_results
+from driver_pool import get_driver_pool
+from scroller import scroll_listings
+from html_parsers import extract_listing_cards
+from browser_extract import IncrementalExtractor, DEFAULT_EXTRACTION, EXTRACTION_MODES
+from prompt_engineering import PromptEngineering
+from llm_client import get_llm_client, TextStream
+from generation_cache import get_generation_cache, parse_generation_range
+from tracing import configure as configure_tracing, span, traced_submit
+from valuation_progress import ValuationProgress
 
 load_dotenv()
+# AUTOVALUATE_TRACE may come from .env
+configure_tracing()
 
-def main():
-    # Get user parameters from UI
-    print("Opening Vehicle Price Predictor UI...")
-    settings = run_ui()
-    
-    if not settings:
-        print("No settings provided. Exiting...")
-        return
-    
-    # Extract settings
-    city = settings['city']
-    make = settings['make']
-    model = settings['model']
-    model_year = settings['model_year']
-    transmission = settings['transmission']
-    car_mileage = settings['car_mileage']
+LIVE_MARKETPLACE_URL = "https://www.facebook.com/marketplace/"
+# Set AUTOVALUATE_MARKETPLACE_URL to run against a replay.py stand-in
+MARKETPLACE_URL = os.getenv("AUTOVALUATE_MARKETPLACE_URL", LIVE_MARKETPLACE_URL)
+
+# Runs the LLM calls of a valuation concurrently with its scrape
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix='llm')
 
-    # Set up Selenium WebDriver
-    options = webdriver.ChromeOptions()
-    options.add_argument('--start-maximized')
-    options.add_argument('--headless=new')
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+def is_replay():
+    """True when searches go to a replay.py stand-in instead of Marketplace"""
+    return MARKETPLACE_URL != LIVE_MARKETPLACE_URL
 
-    # Set up base url
-    base_url = "https://www.facebook.com/marketplace/" + city + "/search?"
 
-    url = base_url + "&transmission=" + transmission + "&query=" + make + "%20" + model
+def get_search_store():
+    """The listing store searches read and merge into. Replayed listings never
+    mix with live ones: they go to a separate in-memory store."""
+    from listing_store import get_listing_store, get_replay_store
+
+    return get_replay_store() if is_replay() else get_listing_store()
+
+
+def build_search_url(city, make, model, transmission):
+    """Build the Marketplace search url for a vehicle search"""
+    base_url = MARKETPLACE_URL + city + "/search?"
+    return base_url + "&transmission=" + transmission + "&query=" + make + "%20" + model
+
+
+def open_search_page(driver, city, make, model, transmission):
+    """Navigate a driver to the Marketplace search and close the login popup"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    url = build_search_url(city, make, model, transmission)
 
     print(f"Searching for {make} {model} vehicles in {city}...")
     print(f"URL: {url}")
 
     # Open the browser and navigate to the url
-    driver.get(url)
+    with span('driver.get', url=url):
+        driver.get(url)
 
     # Close the login popup
-    try:
-        close_button = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'div[aria-label="Close"]'))
-        )
-        close_button.click()
-    except:
-        print("Close button not found or not clickable.")
-
-    # Scroll down to load more results
-    scroll_count = 2
-    scroll_delay = 2
-    print(f"Scrolling {scroll_count} times with {scroll_delay} second delays...")
-    for i in range(scroll_count):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(scroll_delay)
-        print(f"Scroll {i+1}/{scroll_count} completed")
-
-    # Parse the HTML
-    html = driver.page_source
-
-    # Create a BeautifulSoup object from the scraped HTML
-    soup_obj = soup(html, 'html.parser')
-
-    # End the automated browsing session
-    driver.quit()
-
-    # Extract all the necessary info and intert into lists
-    titles_div = soup_obj.find_all('span', class_='x1lliihq x6ikm8r x10wlt62 x1n2onr6')
-    titles_list = [title.text.strip() for title in titles_div]
-    prices_div = soup_obj.find_all('span', class_='x193iq5w xeuugli x13faqbe x1vvkbs x1xmvt09 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x xudqn12 x676frb x1lkfr7t x1lbecb7 x1s688f xzsf02u')
-    prices_list = [price.text.strip() for price in prices_div]
-    content_div = soup_obj.find_all('span', class_='x1lliihq x6ikm8r x10wlt62 x1n2onr6 xlyipyv xuxw1ft x1j85h84')
-    content_list = [content.text.strip() for content in content_div]
-
-    location_pattern = re.compile(r'^[A-Za-z\s\-]+, [A-Z]{2}$')
-    mileage_pattern = re.compile(r'^\d+K (km|miles)$')
-
-    location_list = []
-    mileage_list = []
-
-    i = 0
-    while i < len(content_list):
-        content = content_list[i]
-        if content in ["Log In", "Create new account"]:
-            i += 1
-            continue
-        if location_pattern.match(content):
-            location_list.append(content)
-            if i + 1 < len(content_list) and mileage_pattern.match(content_list[i + 1]):
-                mileage_list.append(content_list[i + 1])
-                i += 2
-            else:
-                mileage_list.append("0K km")
-                i += 1
+    with span('close_popup') as popup_span:
+        try:
+            close_button = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[aria-label="Close"]'))
+            )
+            close_button.click()
+            popup_span.set(found=True)
+        except:
+            print("Close button not found or not clickable.")
+            popup_span.set(found=False)
+
+
+def scrape_listings(city, make, model, transmission, scroll_options=None, progress=None):
+    """Load the Marketplace search page and return its HTML. scroll_options are
+    passed to scroll_listings (target_count, time_budget, ...)"""
+    if progress is None:
+        progress = ValuationProgress()
+    progress.stage('page_load')
+    # Borrow a warm WebDriver from the pool instead of starting a new browser
+    with get_driver_pool().driver() as driver:
+        open_search_page(driver, city, make, model, transmission)
+
+        # Scroll down until enough results are loaded
+        progress.report('scroll')
+        with span('scroll') as scroll_span:
+            added_per_scroll = scroll_listings(driver, **progress.scroll_options(scroll_options))
+            scroll_span.set(scrolls=len(added_per_scroll), listings_added=sum(added_per_scroll))
+
+        with span('page_source') as source_span:
+            html = driver.page_source
+            source_span.set(bytes=len(html))
+        return html
+
+
+def scrape_cards(city, make, model, transmission, scroll_options=None, progress=None):
+    """Load the Marketplace search page and return its listing card records,
+    extracted in the browser after each scroll instead of from page_source"""
+    if progress is None:
+        progress = ValuationProgress()
+    progress.stage('page_load')
+    with get_driver_pool().driver() as driver:
+        open_search_page(driver, city, make, model, transmission)
+
+        extractor = IncrementalExtractor(driver)
+        progress.report('scroll')
+        with span('scroll', extraction='incremental') as scroll_span:
+            extractor.reset()
+            extractor.collect()
+            scroll_listings(driver, **progress.scroll_options(scroll_options, on_scroll=extractor.on_scroll))
+            # Cards that rendered after the last scroll's count check
+            extractor.collect()
+            scroll_span.set(listings=len(extractor.cards), extract_calls=extractor.calls,
+                            bytes=extractor.bytes_transferred)
+
+        print(f"Extracted {len(extractor.cards)} listings in {extractor.calls} calls "
+              f"({extractor.bytes_transferred / 1024:.0f} KB transferred)")
+        return extractor.cards
+
+
+def parse_listings(html, backend=None):
+    """Extract one title/price/location/mileage record per listing card"""
+    with span('parse', backend=backend) as parse_span:
+        cards = extract_listing_cards(html, backend)
+        parse_span.set(cards=len(cards))
+    return cards
+
+
+def filter_vehicles(vehicle_df, rules=None):
+    """Drop placeholder, giveaway and outlier prices and listings without mileage.
+    rules override cleaning.DEFAULT_RULES."""
+    from cleaning import clean_listings
+
+    with span('clean') as clean_span:
+        vehicle_df, dropped = clean_listings(vehicle_df, rules)
+        clean_span.set(kept=len(vehicle_df), dropped=dropped)
+    if any(dropped.values()):
+        print("Dropped listings: " + ", ".join(f"{rule} {count}" for rule, count in dropped.items() if count))
+    return vehicle_df
+
+
+def search_vehicles(city, make, model, transmission, scroll_options=None, max_age=None, cleaning_rules=None,
+                    extraction=DEFAULT_EXTRACTION, progress=None):
+    """Run the scrape -> parse -> filter stages and return the listings DataFrame.
+    Searches scraped less than max_age seconds ago (the store's DEFAULT_TTL when
+    None) are served from the listing store. cleaning_rules are passed to
+    filter_vehicles. extraction is 'page_source' (parse the HTML after scrolling)
+    or 'incremental' (collect new cards in the browser after each scroll).
+    Stages are reported to progress, a ValuationProgress."""
+    if extraction not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode: {extraction}")
+    if progress is None:
+        progress = ValuationProgress()
+    progress.stage('search')
+
+    import pandas as pd
+    from listing_store import DEFAULT_TTL
+    from normalize import normalize_listings, LISTING_COLUMNS
+
+    if max_age is None:
+        max_age = DEFAULT_TTL
+    if is_replay():
+        # Every replayed search is scraped from the stand-in
+        max_age = 0
+    store = get_search_store()
+
+    with span('search', city=city, extraction=extraction) as search_span:
+        vehicles_list = store.get_fresh_listings(city, make, model, transmission, max_age)
+        search_span.set(cache_hit=vehicles_list is not None)
+        if vehicles_list is not None:
+            print(f"Using {len(vehicles_list)} stored listings for {make} {model} in {city}")
         else:
-            i += 1
-
-    mileage_pattern_km = re.compile(r'^\d+K km$')
-    mileage_pattern_miles = re.compile(r'^\d+K miles$')
-
-    mileage_list_cleaned = []
-
-    for mileage in mileage_list:
-        if mileage_pattern_km.match(mileage):
-            mileage_list_cleaned.append(int(mileage.replace('K km', '')) * 1000)
-        elif mileage_pattern_miles.match(mileage):
-            mileage_list_cleaned.append(int(mileage.replace('K miles', '')) * 1609)
-
-    # Add all the values to a list of dictionaries
-    vehicles_list = []
-
-    year_pattern = re.compile(r'\b(19[8-9]\d|20[0-2]\d|2025)\b')
-    for i, item in enumerate(titles_list):
-        title = titles_list[i]
-        title_lower = title.lower()
-        # Check for year, make, and model
-        year_match = year_pattern.search(title_lower)
-        make_match = re.search(make.lower(), title_lower)
-        model_match = re.search(model.lower(), title_lower)
-        if not (year_match and make_match and model_match):
-            continue  # Skip this entry if any are missing
-        vehicles_dict = {}
-        vehicles_dict['Year'] = int(year_match.group(0))
-        vehicles_dict['Make'] = make_match.group(0).capitalize()
-        vehicles_dict['Model'] = model_match.group(0).capitalize()
-        vehicles_dict['Price'] = int(re.sub(r'[^\d.]', '', prices_list[i]))
-        vehicles_dict['Location'] = location_list[i]
-        vehicles_dict['Mileage'] = mileage_list_cleaned[i]
-        vehicles_list.append(vehicles_dict)
-
-    filtered_vehicles_list = []
-    for vehicle in vehicles_list:
-        if vehicle['Price'] in [1, 12, 123, 1234, 12345, 123456, 1234567]:
-            continue
-        if vehicle['Mileage'] == 0:
-            continue
-        if vehicle['Price'] <= 200:
-            continue
-        filtered_vehicles_list.append(vehicle)
-
-    print(f"Found {len(filtered_vehicles_list)} matching vehicles")
+            if extraction == 'incremental':
+                cards = scrape_cards(city, make, model, transmission, scroll_options, progress)
+            else:
+                html = scrape_listings(city, make, model, transmission, scroll_options, progress)
+                progress.stage('parse')
+                cards = parse_listings(html)
+            progress.stage('clean')
+            with span('normalize', cards=len(cards)) as normalize_span:
+                normalized_df = normalize_listings(cards, make, model)
+                normalize_span.set(listings=len(normalized_df))
+            scraped_vehicle_df = filter_vehicles(normalized_df, cleaning_rules)
+
+            # Merge the new listings into the store and use everything it retains
+            with span('store_merge') as merge_span:
+                new_listings = store.merge_listings(city, make, model, transmission, scraped_vehicle_df)
+                vehicles_list = store.get_listings(city, make, model, transmission)
+                merge_span.set(new_listings=new_listings, stored_listings=len(vehicles_list))
+            print(f"Stored {new_listings} new listings")
+
+        print(f"Found {len(vehicles_list)} matching vehicles")
+        search_span.set(listings=len(vehicles_list))
 
     # Continue with DataFrame creation and CSV export
-    vehicle_df = pd.DataFrame(filtered_vehicles_list)
+    vehicle_df = pd.DataFrame(vehicles_list, columns=LISTING_COLUMNS)
     # vehicle_df.to_csv('vehicle_data.csv', index=False)
+    return vehicle_df
+
+
+# Use LLM to get the generation range with enhanced prompt engineering
+def get_generation_prompt(make, model, year, city, prompt_settings=None):
+    # Use enhanced prompt engineering if available
+    if prompt_settings and prompt_settings.get('include_context'):
+        prompt_engineer = PromptEngineering()
+        prompt_data = prompt_engineer.get_enhanced_generation_prompt(make, model, year, city)
+
+        messages = [
+            {"role": "system", "content": prompt_data['system']},
+            {"role": "user", "content": prompt_data['user']}
+        ]
+
+        temperature = prompt_settings.get('temperature', 0.3)
+        max_tokens = prompt_data.get('max_tokens', 200)
+    else:
+        # Fallback to original simple prompt
+        prompt = (
+            f"What generation does a {year} {make} {model} belong to? "
+            "Please answer with only the year range of the generation, e.g., '2000-2005'."
+        )
+        messages = [{"role": "user", "content": prompt}]
+        temperature = 0.0
+        max_tokens = 100
+
+    try:
+        # An answer without a usable range containing the year is not cached,
+        # so the next lookup asks again instead of repeating the fallback
+        return get_llm_client().complete(messages, max_tokens, temperature,
+                                         valid=lambda answer: parse_generation_range(answer, year) is not None)
+    except Exception as e:
+        print(f"Error getting generation: {e}")
+        return None
+
+
+def get_generation_range(make, model, model_year, city, prompt_settings=None):
+    """Return the (start, end) model years of the vehicle's generation. Known
+    vehicles are answered locally; the LLM is only asked on a cache miss."""
+    generation_cache = get_generation_cache()
+
+    with span('generation_range') as generation_span:
+        generation_range = generation_cache.lookup(make, model, model_year)
+        generation_span.set(cache_hit=generation_range is not None)
+        if generation_range is None:
+            answer = get_generation_prompt(make, model, model_year, city, prompt_settings)
+            generation_range = parse_generation_range(answer, model_year)
+            if generation_range:
+                generation_cache.store(make, model, *generation_range)
+            elif answer:
+                print(f"Ignoring invalid generation answer: {answer}")
 
-    # Use LLM to get the generation range with enhanced prompt engineering
-    def get_generation_prompt(make, model, year, prompt_settings=None):
-        client = Groq(api_key=os.getenv("API_KEY"))
-        
-        # Use enhanced prompt engineering if available
-        if prompt_settings and prompt_settings.get('include_context'):
-            from ui import PromptEngineering
-            prompt_engineer = PromptEngineering()
-            prompt_data = prompt_engineer.get_enhanced_generation_prompt(make, model, year, city)
-            
-            messages = [
-                {"role": "system", "content": prompt_data['system']},
-                {"role": "user", "content": prompt_data['user']}
-            ]
-            
-            temperature = prompt_settings.get('temperature', 0.3)
-            max_tokens = prompt_data.get('max_tokens', 200)
-        else:
-            # Fallback to original simple prompt
-            prompt = (
-                f"What generation does a {year} {make} {model} belong to? "
-                "Please answer with only the year range of the generation, e.g., '2000-2005'."
-            )
-            messages = [{"role": "user", "content": prompt}]
-            temperature = 0.0
-            max_tokens = 100
-        
-        try:
-            response = client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error getting generation: {e}")
-            return None
-
-    # Extract prompt engineering settings
-    prompt_settings = settings.get('prompt_engineering', {})
-    
-    generation_range = get_generation_prompt(make, model, model_year, prompt_settings)
     if generation_range:
-        print(f"The {model_year} {make} {model} belongs to the generation: {generation_range}")
+        print(f"The {model_year} {make} {model} belongs to the generation: {generation_range[0]}-{generation_range[1]}")
     else:
         print(f"Could not determine generation for {model_year} {make} {model}")
         # Fallback to a reasonable range
-        generation_range = f"{model_year-2}-{model_year+2}"
-        print(f"Using fallback generation range: {generation_range}")
+        generation_range = (model_year - 2, model_year + 2)
+        print(f"Using fallback generation range: {generation_range[0]}-{generation_range[1]}")
+
+    return generation_range
 
-    # Filter vehicle_df for years within the generation_range
-    gen_start, gen_end = [int(x) for x in generation_range.split('-')]
+
+def filter_generation(vehicle_df, gen_start, gen_end):
+    """Filter vehicle_df for years within the generation range"""
     specific_vehicle_df = vehicle_df[
         (vehicle_df['Year'] >= gen_start) & (vehicle_df['Year'] <= gen_end)
     ]
-
     # specific_vehicle_df.to_csv('specific_vehicle_data.csv', index=False)
+    return specific_vehicle_df
 
-    # Use Linear Regression to predict price based on mileage
-    if len(specific_vehicle_df) >= 2:
-        mileages = specific_vehicle_df['Mileage'].values.reshape(-1, 1)
-        prices = specific_vehicle_df['Price'].values
-        lr_model = LinearRegression().fit(mileages, prices)
-        lr_predicted_price = lr_model.predict(np.array([[car_mileage]]))[0]
+
+def fit_price_model(specific_vehicle_df, search=None, generation_range=None):
+    """Closed-form regression of price on mileage, or None with too few listings.
+    When the listings are a generation of a stored (city, make, model, transmission)
+    search, the listing store's running regression is read instead of refitting."""
+    if search is not None:
+        regression = get_search_store().price_regression(*search, generation_range)
     else:
-        lr_predicted_price = 0
-    
-    # Enhanced AI analysis using prompt engineering
-    def get_ai_price_analysis(make, model, year, mileage, city, prompt_settings):
-        """Get AI-powered price analysis using enhanced prompts"""
-        if not prompt_settings or not prompt_settings.get('include_context'):
-            return None
-            
-        try:
-            from ui import PromptEngineering
-            prompt_engineer = PromptEngineering()
-            prompt_data = prompt_engineer.get_price_analysis_prompt(make, model, year, mileage, city)
-            
-            client = Groq(api_key=os.getenv("API_KEY"))
-            response = client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": prompt_data['system']},
-                    {"role": "user", "content": prompt_data['user']}
-                ],
-                max_tokens=prompt_data['max_tokens'],
-                temperature=prompt_settings.get('temperature', 0.3),
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error getting AI price analysis: {e}")
-            return None
-    
-    def get_market_insights(make, model, city, prompt_settings):
-        """Get market insights using enhanced prompts"""
-        if not prompt_settings or not prompt_settings.get('include_context'):
-            return None
-            
-        try:
-            from ui import PromptEngineering
-            prompt_engineer = PromptEngineering()
-            prompt_data = prompt_engineer.get_market_insights_prompt(make, model, city)
-            
-            client = Groq(api_key=os.getenv("API_KEY"))
-            response = client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": prompt_data['system']},
-                    {"role": "user", "content": prompt_data['user']}
-                ],
-                max_tokens=prompt_data['max_tokens'],
-                temperature=prompt_settings.get('temperature', 0.3),
+        from regression import RunningRegression
+
+        regression = RunningRegression.from_arrays(specific_vehicle_df['Mileage'].to_numpy(),
+                                                   specific_vehicle_df['Price'].to_numpy())
+    return regression if regression.n >= 2 else None
+
+
+def predict_price(lr_model, car_mileage):
+    """Predict the price at car_mileage, 0 when no model could be fitted"""
+    if lr_model is None:
+        return 0
+    return lr_model.predict(car_mileage)
+
+
+def fit_pricing_model(specific_vehicle_df):
+    """Fit the mileage/year/city/transmission pricing model, or None with too few listings"""
+    if len(specific_vehicle_df) < 2:
+        return None
+    from pricing_model import PricingModel
+
+    return PricingModel().fit(specific_vehicle_df)
+
+
+def build_comparables(specific_vehicle_df):
+    """Mileage-sorted index of a generation's listings for comparable-price queries"""
+    from comparables import MileageIndex
+
+    return MileageIndex.from_frame(specific_vehicle_df)
+
+
+def get_comparable_price(specific_vehicle_df, car_mileage, comparables=None):
+    """(average price, method, largest mileage distance) of listings within the
+    comparable mileage window (+-20000km), or of the nearest listings when the
+    window is sparse; method is 'window' or 'nearest'"""
+    if comparables is None:
+        comparables = build_comparables(specific_vehicle_df)
+    return comparables.comparables(car_mileage)
+
+
+# Enhanced AI analysis using prompt engineering
+def get_ai_price_analysis(make, model, year, mileage, city, prompt_settings, stream=False):
+    """Get AI-powered price analysis using enhanced prompts. With stream=True a
+    TextStream is returned that fills in as the answer is generated."""
+    if not prompt_settings or not prompt_settings.get('include_context'):
+        return None
+
+    try:
+        prompt_engineer = PromptEngineering()
+        prompt_data = prompt_engineer.get_price_analysis_prompt(make, model, year, mileage, city)
+
+        messages = [
+            {"role": "system", "content": prompt_data['system']},
+            {"role": "user", "content": prompt_data['user']}
+        ]
+        temperature = prompt_settings.get('temperature', 0.3)
+        if stream:
+            return TextStream(get_llm_client().stream(messages, prompt_data['max_tokens'], temperature), "AI price analysis")
+        return get_llm_client().complete(messages, prompt_data['max_tokens'], temperature)
+    except Exception as e:
+        print(f"Error getting AI price analysis: {e}")
+        return None
+
+
+def get_market_insights(make, model, city, prompt_settings, stream=False):
+    """Get market insights using enhanced prompts, optionally as a TextStream"""
+    if not prompt_settings or not prompt_settings.get('include_context'):
+        return None
+
+    try:
+        prompt_engineer = PromptEngineering()
+        prompt_data = prompt_engineer.get_market_insights_prompt(make, model, city)
+
+        messages = [
+            {"role": "system", "content": prompt_data['system']},
+            {"role": "user", "content": prompt_data['user']}
+        ]
+        temperature = prompt_settings.get('temperature', 0.3)
+        if stream:
+            return TextStream(get_llm_client().stream(messages, prompt_data['max_tokens'], temperature), "market insights")
+        return get_llm_client().complete(messages, prompt_data['max_tokens'], temperature)
+    except Exception as e:
+        print(f"Error getting market insights: {e}")
+        return None
+
+
+def value_vehicle(settings, vehicle_df=None, generation_range=None, lr_model=None, comparables=None,
+                  pricing_model=None, stream_ai=False, progress=None):
+    """Value one vehicle. Pass vehicle_df, generation_range, lr_model,
+    comparables and pricing_model to reuse a scrape, fitted models or mileage
+    index shared with other vehicles from the same search.
+    With stream_ai=True the AI analysis and market insights are returned as
+    TextStreams that are still being generated. Stages are reported to
+    progress, a ValuationProgress whose cancel() stops the valuation with
+    ValuationCancelled at the next stage."""
+    # Extract settings
+    city = settings['city']
+    make = settings['make']
+    model = settings['model']
+    model_year = settings['model_year']
+    transmission = settings['transmission']
+    car_mileage = settings['car_mileage']
+    if progress is None:
+        progress = ValuationProgress()
+
+    with span('valuation', city=city, make=make, model=model, model_year=model_year,
+              car_mileage=car_mileage) as valuation_span:
+        # Extract prompt engineering settings
+        prompt_settings = settings.get('prompt_engineering', {})
+
+        # None of the LLM calls need the scraped listings, so start them before
+        # scraping and let them run while the browser loads and scrolls
+        generation_future = None
+        if generation_range is None:
+            generation_future = traced_submit(
+                LLM_EXECUTOR, get_generation_range, make, model, model_year, city, prompt_settings
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error getting market insights: {e}")
-            return None
-    
-    # Get AI analysis if prompt engineering is enabled
-    ai_price_analysis = None
-    market_insights = None
-    
-    if prompt_settings and prompt_settings.get('include_context'):
-        print("Getting AI-powered price analysis...")
-        ai_price_analysis = get_ai_price_analysis(make, model, model_year, car_mileage, city, prompt_settings)
-        
-        print("Getting market insights...")
-        market_insights = get_market_insights(make, model, city, prompt_settings)
-        
-        if ai_price_analysis:
-            print(f"AI Price Analysis: {ai_price_analysis}")
-        if market_insights:
-            print(f"Market Insights: {market_insights}")
-
-    # Filter for comparable listings with +-20000km of mileage
-    subset_vehicle_df = specific_vehicle_df[
-        (specific_vehicle_df['Mileage'] >= car_mileage - 20000) & (specific_vehicle_df['Mileage'] <= car_mileage + 20000)]
-
-    #subset_vehicle_df.to_csv('subset_vehicle_data.csv', index=False)
-
-    average_subset_vehicle_price = subset_vehicle_df['Price'].mean()
-
-    predicted_price = (lr_predicted_price + average_subset_vehicle_price) / 2
-    
-    # Show results in UI popup
-    vehicle_info = {
-        'model_year': model_year,
-        'make': make.capitalize(),
-        'model': model.capitalize(),
-        'car_mileage': car_mileage,
-        'city': city.capitalize()
-    }
-    
-    show_results(vehicle_info, lr_predicted_price, average_subset_vehicle_price, predicted_price, 
-                len(filtered_vehicles_list), ai_price_analysis, market_insights)
+
+        # Get AI analysis if prompt engineering is enabled
+        ai_price_analysis = None
+        market_insights = None
+        ai_price_analysis_future = None
+        market_insights_future = None
+
+        if prompt_settings and prompt_settings.get('include_context'):
+            if stream_ai:
+                print("Streaming AI-powered price analysis and market insights...")
+                ai_price_analysis = get_ai_price_analysis(make, model, model_year, car_mileage, city, prompt_settings, stream=True)
+                market_insights = get_market_insights(make, model, city, prompt_settings, stream=True)
+            else:
+                print("Getting AI-powered price analysis and market insights...")
+                ai_price_analysis_future = traced_submit(
+                    LLM_EXECUTOR, get_ai_price_analysis, make, model, model_year, car_mileage, city, prompt_settings
+                )
+                market_insights_future = traced_submit(
+                    LLM_EXECUTOR, get_market_insights, make, model, city, prompt_settings
+                )
+
+        # Listings searched here are the store's, so its running regression applies
+        stored_search = None
+        if vehicle_df is None:
+            stored_search = (city, make, model, transmission)
+            vehicle_df = search_vehicles(city, make, model, transmission, settings.get('scroll_options'),
+                                         settings.get('max_age'), settings.get('cleaning_rules'),
+                                         settings.get('extraction', DEFAULT_EXTRACTION), progress)
+
+        progress.stage('generation_range')
+        if generation_future is not None:
+            with span('wait_generation_range'):
+                generation_range = generation_future.result()
+        gen_start, gen_end = generation_range
+        specific_vehicle_df = filter_generation(vehicle_df, gen_start, gen_end)
+
+        progress.stage('price_models')
+        with span('price_models', listings=len(specific_vehicle_df)) as models_span:
+            # Use Linear Regression to predict price based on mileage
+            models_span.set(regression_reused=lr_model is not None, pricing_model_reused=pricing_model is not None)
+            if lr_model is None:
+                lr_model = fit_price_model(specific_vehicle_df, stored_search, generation_range)
+            lr_predicted_price = predict_price(lr_model, car_mileage)
+
+            # Multi-feature model: mileage, year within the generation, city and transmission
+            if pricing_model is None:
+                pricing_model = fit_pricing_model(specific_vehicle_df)
+            model_predicted_price = 0
+            if pricing_model is not None:
+                model_predicted_price = pricing_model.predict(car_mileage, model_year, city, transmission)
+
+        if ai_price_analysis_future is not None:
+            progress.stage('ai_analysis')
+            with span('wait_ai_analysis'):
+                ai_price_analysis = ai_price_analysis_future.result()
+                market_insights = market_insights_future.result()
+
+            if ai_price_analysis:
+                print(f"AI Price Analysis: {ai_price_analysis}")
+            if market_insights:
+                print(f"Market Insights: {market_insights}")
+
+        with span('comparables', reused=comparables is not None):
+            average_subset_vehicle_price, comparables_method, comparables_max_distance = get_comparable_price(
+                specific_vehicle_df, car_mileage, comparables)
+
+        predicted_price = (lr_predicted_price + average_subset_vehicle_price) / 2
+
+        vehicle_info = {
+            'model_year': model_year,
+            'make': make.capitalize(),
+            'model': model.capitalize(),
+            'car_mileage': car_mileage,
+            'city': city.capitalize()
+        }
+
+        valuation_span.set(vehicles_found=len(vehicle_df), generation_listings=len(specific_vehicle_df))
+        return {
+            'vehicle_info': vehicle_info,
+            'generation_range': generation_range,
+            'lr_predicted_price': lr_predicted_price,
+            'model_predicted_price': model_predicted_price,
+            'average_price': average_subset_vehicle_price,
+            'comparables_method': comparables_method,
+            'comparables_max_distance': comparables_max_distance,
+            'predicted_price': predicted_price,
+            'vehicles_found': len(vehicle_df),
+            'ai_price_analysis': ai_price_analysis,
+            'market_insights': market_insights,
+        }
+
+
+def main():
+    from ui import run_app
+
+    # One window serves every search: valuations run on a worker thread, so
+    # the driver pool, listing store and caches stay warm between searches
+    print("Opening Vehicle Price Predictor UI...")
+    run_app(value_vehicle)
 
 if __name__ == "__main__":
     main()
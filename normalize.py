@@ -0,0 +1,94 @@
+"""
+Vectorized normalization of scraped listing cards
+Year/make/model extraction, price cleaning and km/miles conversion run as
+pandas column operations over the whole scrape instead of per title.
+
+Scrapes repeat the same titles, prices and mileage strings many times, so
+each column is factorized first and the string operations run only on its
+distinct values before being broadcast back with the factor codes.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# ItemId is the Marketplace item id of the card, None when its link had none
+LISTING_COLUMNS = ['Year', 'Make', 'Model', 'Price', 'Location', 'Mileage', 'ItemId']
+CARD_FIELDS = ['item_id', 'title', 'price', 'location', 'mileage']
+
+YEAR_PATTERN = re.compile(r'\b(19[8-9]\d|20[0-2]\d|2025)\b')
+MILEAGE_PATTERN = re.compile(r'^(\d+)K (km|miles)$')
+NON_DIGITS = re.compile(r'\D')
+
+KM_PER_THOUSAND = 1000
+KM_PER_THOUSAND_MILES = 1609
+
+
+def _card_columns(cards):
+    """Columns of the card records, without building an intermediate DataFrame"""
+    if isinstance(cards, pd.DataFrame):
+        return {field: cards[field] for field in CARD_FIELDS}
+    return {field: np.array([card[field] for card in cards], dtype=object) for field in CARD_FIELDS}
+
+
+def _per_unique(values, transform, missing):
+    """Apply transform(Series of distinct values) -> ndarray, broadcast back to every row.
+    Rows with a missing value get `missing`."""
+    codes, uniques = pd.factorize(values)
+    transformed = np.asarray(transform(pd.Series(uniques, dtype=object)))
+    result = np.append(transformed, np.asarray([missing], dtype=transformed.dtype))
+    return result[codes]
+
+
+def _parse_titles(titles, make, model):
+    """Model year of each title, 0 when the title lacks a year, the make or the model"""
+    titles = titles.str.lower()
+    years = pd.to_numeric(titles.str.extract(YEAR_PATTERN, expand=False), errors='coerce')
+    matches = titles.str.contains(make, regex=False) & titles.str.contains(model, regex=False)
+    return years.where(matches).fillna(0).to_numpy(dtype=np.int64)
+
+
+def _parse_prices(prices):
+    """Digits of each price string as an integer, -1 when there are none"""
+    digits = prices.str.replace(NON_DIGITS, '', regex=True)
+    return pd.to_numeric(digits.where(digits != ''), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _parse_mileages(mileages):
+    """Kilometres of each "123K km" / "123K miles" string, 0 when unparseable"""
+    parts = mileages.str.extract(MILEAGE_PATTERN)
+    thousands = pd.to_numeric(parts[0], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    factor = np.where(parts[1].to_numpy() == 'miles', KM_PER_THOUSAND_MILES, KM_PER_THOUSAND)
+    return thousands * factor
+
+
+def convert_mileages(mileages):
+    """Convert "123K km" / "123K miles" strings to kilometres, 0 when missing"""
+    return _per_unique(mileages, _parse_mileages, 0)
+
+
+def normalize_listings(cards, make, model):
+    """Turn listing cards into a Year/Make/Model/Price/Location/Mileage/ItemId DataFrame,
+    dropping cards whose title lacks a year, the make or the model"""
+    columns = _card_columns(cards)
+    make = make.lower()
+    model = model.lower()
+
+    # Check for year, make, and model
+    years = _per_unique(columns['title'], lambda titles: _parse_titles(titles, make, model), 0)
+    prices = _per_unique(columns['price'], _parse_prices, -1)
+    locations = np.asarray(columns['location'], dtype=object)
+
+    keep = (years > 0) & (prices >= 0) & pd.notna(locations)
+
+    vehicle_df = pd.DataFrame({
+        'Year': years[keep],
+        'Make': make.capitalize(),
+        'Model': model.capitalize(),
+        'Price': prices[keep],
+        'Location': locations[keep],
+        'Mileage': convert_mileages(columns['mileage'])[keep],
+        'ItemId': np.asarray(columns['item_id'], dtype=object)[keep],
+    }, columns=LISTING_COLUMNS)
+    return vehicle_df
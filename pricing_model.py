@@ -0,0 +1,132 @@
+"""
+Multi-feature pricing model fitted once per scrape
+Price is modelled from mileage, model year within the generation, the
+listing's city (one-hot over cities with enough listings) and transmission
+(when listings of more than one transmission are present). The model is a
+ridge regression on standardized features solved in closed form with
+NumPy, and predicts for a whole batch of target vehicles with a few array
+operations.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ALPHA = 1.0
+
+# Cities with fewer listings get no indicator of their own
+MIN_LOCATION_LISTINGS = 3
+MAX_LOCATIONS = 20
+
+
+def location_keys(locations):
+    """Lowercase city of each "City, Province" location, so it matches a searched city"""
+    return pd.Series(locations, dtype=object).fillna('').astype(str).str.split(',').str[0].str.strip().str.lower()
+
+
+def _codes(values, categories):
+    """Index of each value in categories, -1 when unknown"""
+    return pd.Categorical(values, categories=categories).codes.astype(np.int64)
+
+
+def _key_codes(values, key, categories):
+    """Index of key(value) in categories for every value, -1 when unknown.
+    key runs once per distinct value, since targets repeat a few cities."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    lookup = np.append(_codes(key(uniques), categories), -1)
+    return lookup[codes]
+
+
+def transmission_keys(transmissions):
+    """Lowercase transmission names"""
+    return pd.Series(transmissions, dtype=object).astype(str).str.lower()
+
+
+class PricingModel:
+    """Ridge regression of price on mileage, year, city and transmission"""
+
+    def __init__(self, alpha=DEFAULT_ALPHA, min_location_listings=MIN_LOCATION_LISTINGS,
+                 max_locations=MAX_LOCATIONS):
+        self.alpha = alpha
+        self.min_location_listings = min_location_listings
+        self.max_locations = max_locations
+        self.locations = []
+        self.transmissions = []
+        self.intercept = 0.0
+        self.mileage_coef = 0.0
+        self.year_coef = 0.0
+        self.location_coefs = np.zeros(0)
+        self.transmission_coefs = np.zeros(0)
+        self.n = 0
+
+    def _features(self, mileages, years, location_codes, transmission_codes):
+        """Unscaled design matrix with one indicator column per known city and transmission"""
+        columns = [np.asarray(mileages, dtype=np.float64), np.asarray(years, dtype=np.float64)]
+        columns += [(location_codes == code).astype(np.float64) for code in range(len(self.locations))]
+        columns += [(transmission_codes == code).astype(np.float64) for code in range(len(self.transmissions))]
+        return np.column_stack(columns)
+
+    def fit(self, vehicle_df):
+        """Fit on a DataFrame with Mileage, Year, Price, Location and optionally Transmission"""
+        self.n = len(vehicle_df)
+        if self.n < 2:
+            raise ValueError("At least two listings are needed to fit a pricing model")
+
+        keys = location_keys(vehicle_df['Location'].to_numpy())
+        counts = keys[keys != ''].value_counts()
+        self.locations = sorted(counts[counts >= self.min_location_listings].index[:self.max_locations])
+        location_codes = _codes(keys, self.locations)
+
+        if 'Transmission' in vehicle_df:
+            self.transmissions = sorted(transmission_keys(vehicle_df['Transmission'].dropna()).unique())
+            transmission_codes = _key_codes(vehicle_df['Transmission'], transmission_keys, self.transmissions)
+        else:
+            self.transmissions = []
+            transmission_codes = np.zeros(self.n, dtype=np.int64)
+
+        features = self._features(vehicle_df['Mileage'].to_numpy(), vehicle_df['Year'].to_numpy(),
+                                  location_codes, transmission_codes)
+        prices = vehicle_df['Price'].to_numpy(dtype=np.float64)
+
+        # Standardize so one alpha suits kilometres, years and indicators alike
+        means = features.mean(axis=0)
+        scales = features.std(axis=0)
+        scales[scales == 0] = 1.0
+        standardized = (features - means) / scales
+        gram = standardized.T @ standardized + self.alpha * np.eye(standardized.shape[1])
+        beta = np.linalg.solve(gram, standardized.T @ (prices - prices.mean())) / scales
+
+        self.intercept = prices.mean() - means @ beta
+        self.mileage_coef, self.year_coef = beta[0], beta[1]
+        self.location_coefs = np.append(beta[2:2 + len(self.locations)], 0.0)
+        self.transmission_coefs = np.append(beta[2 + len(self.locations):], 0.0)
+        return self
+
+    def predict(self, mileages, years, locations=None, transmissions=None):
+        """Predicted prices for arrays of targets. locations and transmissions may
+        be arrays or a single value for every target; unknown values add no effect.
+        A single target (scalar mileage) gets a float back."""
+        scalar = np.ndim(mileages) == 0
+        mileages = np.asarray(mileages, dtype=np.float64)
+        years = np.asarray(years, dtype=np.float64)
+        prices = self.intercept + self.mileage_coef * mileages + self.year_coef * years
+
+        if locations is not None and self.locations:
+            if np.ndim(locations) == 0:
+                locations = [locations]
+            # Unknown values get code -1, which picks the trailing 0.0
+            prices = prices + self.location_coefs[_key_codes(locations, location_keys, self.locations)]
+        if transmissions is not None and self.transmissions:
+            if np.ndim(transmissions) == 0:
+                transmissions = [transmissions]
+            prices = prices + self.transmission_coefs[_key_codes(transmissions, transmission_keys, self.transmissions)]
+        if scalar:
+            return float(np.ravel(prices)[0])
+        return prices
+
+    def coefficients(self):
+        """Fitted effect of each feature in dollars per unit"""
+        coefficients = {'intercept': self.intercept, 'mileage': self.mileage_coef, 'year': self.year_coef}
+        coefficients.update({f"location={name}": coef for name, coef in zip(self.locations, self.location_coefs)})
+        coefficients.update({f"transmission={name}": coef
+                             for name, coef in zip(self.transmissions, self.transmission_coefs)})
+        return coefficients
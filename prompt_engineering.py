@@ -0,0 +1,64 @@
+"""
+Prompt building for AutoValuate's LLM calls
+Kept apart from the Tkinter UI so the valuation pipeline, batch runs and
+prompt_examples.py can build prompts without loading Tk.
+"""
+
+from prompt_registry import get_template_registry
+
+
+class PromptEngineering:
+    """Advanced prompt engineering for AI interactions"""
+    
+    def __init__(self, registry=None):
+        # Templates are loaded from prompt_config.json once and shared
+        self.registry = registry or get_template_registry()
+    
+    @property
+    def prompt_templates(self):
+        return self.registry.prompt_templates
+    
+    @property
+    def context_enhancers(self):
+        return self.registry.context_enhancers
+    
+    def build_prompt(self, template_name, variables, include_context=True, temperature=0.3):
+        """Build a structured prompt with context and examples"""
+        template = self.registry.get(template_name)
+        
+        return {
+            'system': template.system,
+            'user': template.render(variables, include_context),
+            'temperature': temperature,
+            'max_tokens': template.max_tokens
+        }
+    
+    def get_enhanced_generation_prompt(self, make, model, year, city):
+        """Get enhanced generation prompt with market context"""
+        variables = {
+            'year': year,
+            'make': make,
+            'model': model,
+            'city': city
+        }
+        return self.build_prompt('vehicle_generation', variables, include_context=True)
+    
+    def get_price_analysis_prompt(self, make, model, year, mileage, city):
+        """Get price analysis prompt with market insights"""
+        variables = {
+            'year': year,
+            'make': make,
+            'model': model,
+            'mileage': f"{mileage:,}",
+            'city': city
+        }
+        return self.build_prompt('price_analysis', variables, include_context=True)
+    
+    def get_market_insights_prompt(self, make, model, city):
+        """Get market insights prompt for regional analysis"""
+        variables = {
+            'make': make,
+            'model': model,
+            'city': city
+        }
+        return self.build_prompt('market_insights', variables, include_context=True)
@@ -4,7 +4,7 @@ Prompt Engineering Examples for AutoValuate
 This script demonstrates the advanced prompt engineering capabilities
 """
 
-from ui import PromptEngineering
+from prompt_engineering import PromptEngineering
 import json
 
 def demonstrate_prompt_engineering():
@@ -0,0 +1,218 @@
+"""
+Prompt template registry for AutoValuate
+prompt_config.json is loaded and validated once per process, and the static
+parts of every prompt (context and examples sections) are rendered when the
+file is loaded, so building a prompt only substitutes its variables. The
+file is re-read when its modification time changes.
+"""
+
+import json
+import os
+import string
+import threading
+import time
+
+PROMPT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompt_config.json')
+
+# How often, in seconds, the config file's modification time is checked
+RELOAD_CHECK_INTERVAL = 1.0
+
+DEFAULT_MAX_TOKENS = 200
+
+# Number of context factors added to a prompt when context is included
+CONTEXT_FACTOR_COUNT = 3
+
+# Used when prompt_config.json is missing or invalid
+DEFAULT_CONFIG = {
+    'prompt_templates': {
+        'vehicle_generation': {
+            'system': "You are an expert automotive analyst specializing in vehicle generations and model years. Provide accurate, concise information about vehicle generations.",
+            'user_template': "What generation does a {year} {make} {model} belong to? Please answer with only the year range of the generation, e.g., '2000-2005'. If uncertain, provide the most likely range based on common knowledge.",
+            'examples': [
+                {"input": "What generation does a 2005 Toyota Corolla belong to?", "output": "2003-2008"},
+                {"input": "What generation does a 2018 Honda Civic belong to?", "output": "2016-2021"}
+            ]
+        },
+        'price_analysis': {
+            'system': "You are a professional vehicle appraiser with expertise in market analysis. Analyze vehicle pricing factors and provide insights.",
+            'user_template': "Analyze the pricing for a {year} {make} {model} with {mileage}km in {city}. Consider factors like market trends, location, and condition. Provide a brief analysis in 2-3 sentences.",
+            'examples': [
+                {"input": "Analyze pricing for a 2010 Honda Civic with 150000km in Toronto", "output": "The 2010 Honda Civic is in the 8th generation (2006-2011), known for reliability. With 150,000km, this vehicle is in the mid-life range where depreciation typically stabilizes. Toronto's market tends to command higher prices due to urban demand and limited parking, suggesting a premium of 10-15% over rural areas."}
+            ]
+        },
+        'market_insights': {
+            'system': "You are a market research analyst specializing in automotive industry trends and regional market dynamics.",
+            'user_template': "What are the key market factors affecting {make} {model} prices in {city}? Consider seasonal trends, supply/demand, and regional preferences.",
+            'examples': [
+                {"input": "What affects Toyota Corolla prices in Calgary?", "output": "Calgary's Toyota Corolla market is influenced by the city's strong economy and preference for reliable vehicles. Winter conditions favor AWD/4WD models, while fuel efficiency remains important. Seasonal fluctuations occur with spring/summer typically showing 5-10% higher prices due to increased demand."}
+            ]
+        }
+    },
+    'context_enhancers': {
+        'seasonal_factors': [
+            "Consider current season and its impact on vehicle demand",
+            "Factor in seasonal maintenance requirements",
+            "Account for weather-related market fluctuations"
+        ],
+        'market_conditions': [
+            "Include current economic indicators",
+            "Consider supply chain impacts",
+            "Factor in fuel price trends"
+        ],
+        'regional_specifics': [
+            "Account for local market preferences",
+            "Consider regional economic factors",
+            "Include local competition analysis"
+        ]
+    }
+}
+
+
+def validate_config(config):
+    """Raise ValueError describing the first problem in a prompt config"""
+    templates = config.get('prompt_templates') if isinstance(config, dict) else None
+    if not isinstance(templates, dict) or not templates:
+        raise ValueError("prompt_templates must be a non-empty object")
+
+    for name, template in templates.items():
+        if not isinstance(template, dict):
+            raise ValueError(f"Template {name} must be an object")
+        for field in ('system', 'user_template'):
+            if not isinstance(template.get(field), str):
+                raise ValueError(f"Template {name} needs a string {field}")
+        try:
+            list(string.Formatter().parse(template['user_template']))
+        except ValueError as e:
+            raise ValueError(f"Template {name} has an invalid user_template: {e}")
+        for example in template.get('examples', []):
+            if not isinstance(example, dict) or not isinstance(example.get('input'), str) \
+                    or not isinstance(example.get('output'), str):
+                raise ValueError(f"Template {name} has an example without string input and output")
+        max_tokens = template.get('max_tokens', DEFAULT_MAX_TOKENS)
+        if not isinstance(max_tokens, int) or max_tokens <= 0:
+            raise ValueError(f"Template {name} needs a positive integer max_tokens")
+
+    enhancers = config.get('context_enhancers', {})
+    if not isinstance(enhancers, dict) or not all(
+            isinstance(factors, list) and all(isinstance(factor, str) for factor in factors)
+            for factors in enhancers.values()):
+        raise ValueError("context_enhancers must map names to lists of strings")
+
+
+def render_context(context_enhancers):
+    """The "Additional considerations" section appended when context is included"""
+    context_parts = []
+    for context_type, factors in context_enhancers.items():
+        context_parts.extend(factors)
+
+    context_text = "Additional considerations:\n" + "\n".join(f"• {factor}" for factor in context_parts[:CONTEXT_FACTOR_COUNT])
+    return f"\n\n{context_text}"
+
+
+def render_examples(examples):
+    """The few-shot "Examples" section of a template, empty without examples"""
+    if not examples:
+        return ""
+    examples_text = "\n\nExamples:\n"
+    for example in examples:
+        examples_text += f"Q: {example['input']}\nA: {example['output']}\n"
+    return examples_text
+
+
+class CompiledTemplate:
+    """A template with its static sections rendered ahead of time"""
+
+    def __init__(self, name, template, context_text):
+        self.name = name
+        self.system = template['system']
+        self.user_template = template['user_template']
+        self.max_tokens = template.get('max_tokens', DEFAULT_MAX_TOKENS)
+        self.variables = {field for _, field, _, _ in string.Formatter().parse(self.user_template) if field}
+        self.context_text = context_text
+        self.examples_text = render_examples(template.get('examples'))
+
+    def render(self, variables, include_context=True):
+        """User prompt with variables substituted and the static sections appended"""
+        missing = self.variables.difference(variables)
+        if missing:
+            raise ValueError(f"Missing variables for {self.name}: {', '.join(sorted(missing))}")
+
+        user_prompt = self.user_template.format(**variables)
+        if include_context:
+            user_prompt += self.context_text
+        return user_prompt + self.examples_text
+
+
+class TemplateRegistry:
+    """Compiled prompt templates, reloaded when the config file changes"""
+
+    def __init__(self, path=PROMPT_CONFIG_FILE, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._load(initial=True)
+
+    def _load(self, initial=False):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+            validate_config(config)
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError
+            if initial:
+                print(f"Using built-in prompt templates: {e}")
+                self._compile(DEFAULT_CONFIG)
+            else:
+                print(f"Keeping previous prompt templates: {e}")
+            return
+
+        self._compile(config)
+        self._mtime = mtime
+
+    def _compile(self, config):
+        self.config = config
+        self.prompt_templates = config['prompt_templates']
+        self.context_enhancers = config.get('context_enhancers', {})
+        context_text = render_context(self.context_enhancers)
+        self.compiled = {
+            name: CompiledTemplate(name, template, context_text)
+            for name, template in self.prompt_templates.items()
+        }
+
+    def reload_if_changed(self):
+        """Re-read the config file if its modification time changed"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self._load()
+
+    def get(self, name):
+        """The compiled template called name"""
+        self.reload_if_changed()
+        template = self.compiled.get(name)
+        if template is None:
+            raise ValueError(f"Unknown template: {name}")
+        return template
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_template_registry():
+    """Return the process-wide template registry, loading it on first use"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = TemplateRegistry()
+        return _default_registry
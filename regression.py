@@ -0,0 +1,182 @@
+"""
+Closed-form, incremental price-on-mileage regression
+A single-feature least-squares line only needs the running sums n, Σx, Σy,
+Σxy, Σx² (and Σy² for the residual spread), so listings can be added or
+expired in O(1) and predictions never refit. Sums are shifted by the first
+point seen, which keeps the centered sums accurate to float64 rounding for
+large mileages.
+
+RegressionBook keeps one running regression per search and generation; the
+listing store feeds it every listing it merges or expires.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+
+class RunningRegression:
+    """Least-squares fit of y on x maintained from running sums"""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self._x0 = 0.0
+        self._y0 = 0.0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+        self._syy = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        """Regression over every (x, y) pair of two arrays"""
+        regression = cls()
+        regression.add_many(x, y)
+        return regression
+
+    def _update(self, x, y, sign):
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if len(x) != len(y):
+            raise ValueError(f"x and y differ in length: {len(x)} != {len(y)}")
+        if not len(x):
+            return
+        if self.n == 0:
+            if sign < 0:
+                raise ValueError("Cannot remove points from an empty regression")
+            self._x0, self._y0 = float(x[0]), float(y[0])
+
+        dx = x - self._x0
+        dy = y - self._y0
+        self.n += sign * len(x)
+        self._sx += sign * float(dx.sum())
+        self._sy += sign * float(dy.sum())
+        self._sxx += sign * float(np.dot(dx, dx))
+        self._sxy += sign * float(np.dot(dx, dy))
+        self._syy += sign * float(np.dot(dy, dy))
+
+        if self.n < 0:
+            raise ValueError("Removed more points than were added")
+        if self.n == 0:
+            # Drop any rounding left over once every point is gone
+            self._reset()
+
+    def add(self, x, y):
+        self._update((x,), (y,), 1)
+
+    def remove(self, x, y):
+        """Remove a point that was added before, e.g. an expired listing"""
+        self._update((x,), (y,), -1)
+
+    def add_many(self, x, y):
+        self._update(x, y, 1)
+
+    def remove_many(self, x, y):
+        self._update(x, y, -1)
+
+    def _centered(self):
+        """Σ(x-x̄)², Σ(x-x̄)(y-ȳ), Σ(y-ȳ)²"""
+        sxx = self._sxx - self._sx * self._sx / self.n
+        sxy = self._sxy - self._sx * self._sy / self.n
+        syy = self._syy - self._sy * self._sy / self.n
+        return max(sxx, 0.0), sxy, max(syy, 0.0)
+
+    @property
+    def slope(self):
+        """Price change per unit of x; 0 when every x is the same, like sklearn"""
+        if self.n < 2:
+            return 0.0
+        sxx, sxy, _ = self._centered()
+        return sxy / sxx if sxx > 0 else 0.0
+
+    @property
+    def intercept(self):
+        if self.n == 0:
+            return 0.0
+        mean_x = self._x0 + self._sx / self.n
+        mean_y = self._y0 + self._sy / self.n
+        return mean_y - self.slope * mean_x
+
+    @property
+    def residual_std(self):
+        """Standard deviation of the residuals around the line, 0 with two points or fewer"""
+        if self.n <= 2:
+            return 0.0
+        sxx, sxy, syy = self._centered()
+        sse = syy - (sxy * sxy / sxx if sxx > 0 else 0.0)
+        return math.sqrt(max(sse, 0.0) / (self.n - 2))
+
+    def copy(self):
+        """Independent snapshot that later updates to this regression do not change"""
+        regression = RunningRegression()
+        regression.__dict__.update(self.__dict__)
+        return regression
+
+    def predict(self, x):
+        """Predicted y for a scalar or an array of x"""
+        if np.ndim(x) == 0:
+            return self.intercept + self.slope * float(x)
+        return self.intercept + self.slope * np.asarray(x, dtype=np.float64)
+
+    def summary(self):
+        return {
+            'n': self.n,
+            'slope': self.slope,
+            'intercept': self.intercept,
+            'residual_std': self.residual_std,
+        }
+
+
+class RegressionBook:
+    """Running regressions per (search, generation), fed listing by listing.
+    A search is the normalized (city, make, model, transmission) key of the listing store."""
+
+    def __init__(self):
+        self._regressions = {}
+        self._lock = threading.Lock()
+
+    def _key(self, search, generation_range):
+        return tuple(search) + (int(generation_range[0]), int(generation_range[1]))
+
+    def get(self, search, generation_range):
+        """The regression for a generation, None if it is not tracked"""
+        with self._lock:
+            return self._regressions.get(self._key(search, generation_range))
+
+    def fit(self, search, generation_range, mileages, prices):
+        """Start tracking a generation from its current listings, replacing any previous fit"""
+        regression = RunningRegression.from_arrays(mileages, prices)
+        with self._lock:
+            self._regressions[self._key(search, generation_range)] = regression
+        return regression
+
+    def _apply(self, search, years, mileages, prices, sign):
+        search = tuple(search)
+        years = np.asarray(years)
+        mileages = np.asarray(mileages)
+        prices = np.asarray(prices)
+        with self._lock:
+            for key, regression in self._regressions.items():
+                if key[:-2] != search:
+                    continue
+                gen_start, gen_end = key[-2:]
+                in_generation = (years >= gen_start) & (years <= gen_end)
+                if in_generation.any():
+                    regression._update(mileages[in_generation], prices[in_generation], sign)
+
+    def add_listings(self, search, years, mileages, prices):
+        """Add new listings to every tracked generation of the search containing their year"""
+        self._apply(search, years, mileages, prices, 1)
+
+    def remove_listings(self, search, years, mileages, prices):
+        """Remove expired listings from every tracked generation of the search containing their year"""
+        self._apply(search, years, mileages, prices, -1)
+
+    def clear(self):
+        with self._lock:
+            self._regressions.clear()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Offline record and replay of Marketplace searches
+Record mode runs a real search and saves the scrolled page as a gzipped
+snapshot together with its search parameters. Replay mode serves those
+snapshots from a local HTTP stand-in for Marketplace: the search page holds
+the first batch of listing cards and every scroll to the bottom fetches and
+appends the next batch, after a configurable latency, the way the real
+infinite scroll does. Pointing MARKETPLACE_URL at the stand-in runs the
+unchanged Selenium, parsing and valuation code against a fixed set of
+listings.
+
+    python replay.py record --city calgary --make toyota --model corolla
+    python replay.py serve --latency 0.3
+    AUTOVALUATE_MARKETPLACE_URL=http://127.0.0.1:8765/marketplace/ python main.py
+"""
+
+import argparse
+import gzip
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from html_parsers import available_backends
+from scroller import LISTING_CARD_SELECTOR
+
+DEFAULT_SNAPSHOT_DIR = 'snapshots'
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = 0.0
+DEFAULT_CARDS_PER_SCROLL = 24
+
+SNAPSHOT_SUFFIX = '.json.gz'
+CHUNK_PATH = '/__replay/chunk'
+
+# Served in place of the search page; the script appends the next chunk of
+# cards whenever the page is scrolled to the bottom
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>Marketplace replay</title>
+<style>a[href*="/marketplace/item/"] {display: block; min-height: 120px;}</style>
+</head><body>
+<div aria-label="Close" role="button" onclick="this.remove()">Close</div>
+<div role="main"><div id="replay-feed" aria-label="Collection of Marketplace items">%(cards)s</div></div>
+<script>
+const chunkCount = %(chunk_count)d;
+let nextChunk = 1;
+let loading = false;
+function loadMore() {
+    if (loading || nextChunk >= chunkCount) {
+        return;
+    }
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) {
+        return;
+    }
+    loading = true;
+    fetch(%(chunk_url)s + nextChunk)
+        .then(response => response.text())
+        .then(cards => {
+            document.getElementById('replay-feed').insertAdjacentHTML('beforeend', cards);
+            nextChunk++;
+        })
+        .finally(() => { loading = false; });
+}
+window.addEventListener('scroll', loadMore);
+setInterval(loadMore, 100);
+</script>
+</body></html>
+"""
+
+
+def snapshot_key(city, query, transmission):
+    """File name stem of the snapshot of a search; query is "make model" """
+    parts = [city, query, transmission]
+    return '_'.join(re.sub(r'[^a-z0-9]+', '-', part.strip().lower()).strip('-') for part in parts)
+
+
+def save_snapshot(directory, city, make, model, transmission, page_html, url=None):
+    """Write a scraped page with its search parameters to directory; returns the path"""
+    os.makedirs(directory, exist_ok=True)
+    query = f"{make} {model}"
+    snapshot = {
+        'city': city,
+        'make': make,
+        'model': model,
+        'transmission': transmission,
+        'url': url,
+        'recorded_at': time.time(),
+        'html': page_html,
+    }
+    path = os.path.join(directory, snapshot_key(city, query, transmission) + SNAPSHOT_SUFFIX)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    return path
+
+
+def load_snapshot(path):
+    """Read a snapshot written by save_snapshot"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def split_cards(page_html):
+    """Outer HTML of every listing card link in a page, in page order"""
+    if 'selectolax' in available_backends():
+        from selectolax.lexbor import LexborHTMLParser
+        return [node.html for node in LexborHTMLParser(page_html).css(LISTING_CARD_SELECTOR)]
+
+    from bs4 import BeautifulSoup as soup
+    return [str(link) for link in soup(page_html, 'html.parser').select(LISTING_CARD_SELECTOR)]
+
+
+class SnapshotLibrary:
+    """Recorded searches split into scroll-sized chunks of card HTML"""
+
+    def __init__(self, cards_per_scroll=DEFAULT_CARDS_PER_SCROLL):
+        self.cards_per_scroll = cards_per_scroll
+        self.chunks = {}
+
+    def add(self, snapshot):
+        """Add a loaded snapshot; returns its key"""
+        key = snapshot_key(snapshot['city'], f"{snapshot['make']} {snapshot['model']}", snapshot['transmission'])
+        cards = split_cards(snapshot['html'])
+        step = self.cards_per_scroll
+        self.chunks[key] = [''.join(cards[start:start + step]) for start in range(0, len(cards), step)] or ['']
+        return key
+
+    def load_directory(self, directory):
+        """Add every snapshot in directory"""
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SNAPSHOT_SUFFIX):
+                key = self.add(load_snapshot(os.path.join(directory, name)))
+                print(f"Loaded {key}: {len(self.chunks[key])} chunks")
+        return self
+
+    def page(self, key):
+        """The search page for key, holding its first chunk, or None if it was not recorded"""
+        chunks = self.chunks.get(key)
+        if chunks is None:
+            return None
+        return PAGE_TEMPLATE % {
+            'cards': chunks[0],
+            'chunk_count': len(chunks),
+            'chunk_url': json.dumps(f"{CHUNK_PATH}?key={key}&n="),
+        }
+
+    def chunk(self, key, index):
+        """Card HTML of chunk index of key, or None"""
+        chunks = self.chunks.get(key)
+        if chunks is None or not 0 <= index < len(chunks):
+            return None
+        return chunks[index]
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves search pages and scroll chunks from the server's SnapshotLibrary"""
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        body = None
+        if url.path == CHUNK_PATH:
+            try:
+                body = server.library.chunk(params['key'][0], int(params['n'][0]))
+            except (KeyError, ValueError):
+                body = None
+        else:
+            # /marketplace/<city>/search?&transmission=...&query=make%20model
+            match = re.fullmatch(r'/marketplace/([^/]+)/search/?', url.path)
+            if match:
+                key = snapshot_key(unquote(match.group(1)), params.get('query', [''])[0],
+                                   params.get('transmission', [''])[0])
+                body = server.library.page(key)
+
+        if body is None:
+            self.send_error(404, "No snapshot recorded for " + html.escape(self.path))
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ReplayServer:
+    """Local Marketplace stand-in serving a SnapshotLibrary on a background thread.
+    Use as a context manager; base_url replaces MARKETPLACE_URL."""
+
+    def __init__(self, library, host='127.0.0.1', port=DEFAULT_PORT, latency=DEFAULT_LATENCY, verbose=False):
+        self.httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.library = library
+        self.httpd.latency = latency
+        self.httpd.verbose = verbose
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/marketplace/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def use_replay(server):
+    """Point main's searches at a running ReplayServer. Their listings then go to
+    a separate in-memory store and are never served from the live listing cache."""
+    import main
+    main.MARKETPLACE_URL = server.base_url
+
+
+def record(directory, city, make, model, transmission, scroll_options=None):
+    """Run a live search and save its scrolled page as a snapshot; returns the path"""
+    from main import build_search_url, scrape_listings
+
+    page_html = scrape_listings(city, make, model, transmission, scroll_options)
+    path = save_snapshot(directory, city, make, model, transmission, page_html,
+                         url=build_search_url(city, make, model, transmission))
+    print(f"Recorded {len(split_cards(page_html))} listings to {path}")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record Marketplace searches or replay them from a local server")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="Scrape a live search and save it as a snapshot")
+    record_parser.add_argument('--city', required=True)
+    record_parser.add_argument('--make', required=True)
+    record_parser.add_argument('--model', required=True)
+    record_parser.add_argument('--transmission', default='automatic', choices=['automatic', 'manual'])
+    record_parser.add_argument('--dir', default=DEFAULT_SNAPSHOT_DIR)
+    record_parser.add_argument('--target-listings', type=int, default=None,
+                               help="Stop scrolling once this many listings are loaded")
+
+    serve_parser = commands.add_parser('serve', help="Serve recorded snapshots as a Marketplace stand-in")
+    serve_parser.add_argument('--dir', default=DEFAULT_SNAPSHOT_DIR)
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                              help="Seconds to wait before answering each request")
+    serve_parser.add_argument('--cards-per-scroll', type=int, default=DEFAULT_CARDS_PER_SCROLL,
+                              help="Listings appended by each scroll")
+    serve_parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        scroll_options = {'target_count': args.target_listings} if args.target_listings else None
+        record(args.dir, args.city, args.make, args.model, args.transmission, scroll_options)
+        return 0
+
+    library = SnapshotLibrary(args.cards_per_scroll).load_directory(args.dir)
+    server = ReplayServer(library, args.host, args.port, args.latency, args.verbose)
+    print(f"Serving {len(library.chunks)} searches at {server.base_url}")
+    print(f"Run with AUTOVALUATE_MARKETPLACE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
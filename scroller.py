@@ -0,0 +1,78 @@
+"""
+Adaptive infinite-scroll loading for the Marketplace search page
+Instead of sleeping a fixed delay after every scroll, the loader waits only
+until the number of listing cards changes, backs off when growth stalls and
+stops at a target listing count or time budget.
+"""
+
+import time
+
+# Every listing card is a link to its item page
+LISTING_CARD_SELECTOR = 'a[href*="/marketplace/item/"]'
+
+COUNT_LISTINGS_SCRIPT = "return document.querySelectorAll(arguments[0]).length;"
+SCROLL_SCRIPT = "window.scrollTo(0, document.body.scrollHeight);"
+
+DEFAULT_TARGET_COUNT = 200
+DEFAULT_TIME_BUDGET = 20.0
+
+
+def count_listings(driver):
+    """Number of listing cards currently in the page"""
+    return driver.execute_script(COUNT_LISTINGS_SCRIPT, LISTING_CARD_SELECTOR)
+
+
+def wait_for_growth(driver, previous_count, timeout, poll_interval=0.1):
+    """Poll the listing count until it changes or timeout seconds pass"""
+    deadline = time.monotonic() + timeout
+    count = count_listings(driver)
+    while count == previous_count and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        count = count_listings(driver)
+    return count
+
+
+def scroll_listings(driver, target_count=DEFAULT_TARGET_COUNT, time_budget=DEFAULT_TIME_BUDGET,
+                    stall_timeout=1.0, max_stall_timeout=4.0, max_stalls=3, poll_interval=0.1,
+                    on_scroll=None, should_stop=None):
+    """Scroll until target_count cards are loaded, the time budget runs out or
+    max_stalls scrolls in a row add nothing. Each stalled scroll doubles the
+    wait for the next one up to max_stall_timeout. Returns the number of
+    listings added by each scroll; on_scroll(added, total) is called per scroll
+    and scrolling stops early once should_stop() returns True."""
+    start = time.monotonic()
+    count = count_listings(driver)
+    added_per_scroll = []
+    wait = stall_timeout
+    stalls = 0
+
+    while count < target_count:
+        remaining = time_budget - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        if should_stop is not None and should_stop():
+            print("Scrolling stopped")
+            break
+
+        driver.execute_script(SCROLL_SCRIPT)
+        new_count = wait_for_growth(driver, count, min(wait, remaining), poll_interval)
+        added = new_count - count
+        count = new_count
+        added_per_scroll.append(added)
+
+        print(f"Scroll {len(added_per_scroll)}: +{added} listings ({count} loaded)")
+        if on_scroll:
+            on_scroll(added, count)
+
+        if added > 0:
+            stalls = 0
+            wait = stall_timeout
+        else:
+            stalls += 1
+            if stalls >= max_stalls:
+                break
+            wait = min(wait * 2, max_stall_timeout)
+
+    elapsed = time.monotonic() - start
+    print(f"Loaded {count} listings in {len(added_per_scroll)} scrolls ({elapsed:.1f}s)")
+    return added_per_scroll
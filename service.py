@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local HTTP valuation service for AutoValuate
+A long-running process that values vehicles posted as JSON, for tools that
+cannot drive the UI. The driver pool, LLM client, prompt templates, listing
+store and generation cache are created once at startup and stay warm across
+requests.
+
+Requests that need the same (city, make, model, transmission) search while
+it is being scraped wait for that one scrape instead of starting their own.
+The fitted price models and mileage index of each search and generation are
+kept and reused until the search's stored listings change.
+Valuations run on a bounded worker pool; when more than --max-queue requests
+are waiting, new ones are turned away with 503. GET /metrics reports the
+queue depth, active workers, coalesced searches and LLM counters.
+
+    python service.py --port 8080 --workers 4
+    curl -X POST localhost:8080/valuate -d '{"city": "calgary", "make": "toyota", "model": "corolla",
+        "model_year": 2015, "transmission": "automatic", "car_mileage": 120000}'
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from main import (
+    search_vehicles, value_vehicle, get_generation_range, filter_generation, fit_price_model,
+    fit_pricing_model, build_comparables, get_search_store, LLM_EXECUTOR
+)
+from batch import parse_vehicle, search_key, format_valuation
+from driver_pool import get_driver_pool
+from scroller import DEFAULT_TARGET_COUNT, DEFAULT_TIME_BUDGET
+from browser_extract import DEFAULT_EXTRACTION, EXTRACTION_MODES
+from listing_store import DEFAULT_TTL, get_listing_store
+from llm_client import get_llm_client
+from prompt_registry import get_template_registry
+from generation_cache import get_generation_cache
+from tracing import span, traced_submit
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_REQUEST_TIMEOUT = 180.0
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024
+
+
+class QueueFull(Exception):
+    """Raised when too many valuations are already waiting for a worker"""
+
+
+class SearchCoalescer:
+    """Runs at most one search per key at a time; callers asking for a key
+    that is in flight wait for its result"""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(self, key, search):
+        """search() for key, or the result of the call already running for key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(search())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            # Later requests read the fresh listings from the listing store
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+    def inflight(self):
+        with self._lock:
+            return len(self._inflight)
+
+
+class ValuationService:
+    """Bounded worker pool that values vehicles with shared, warm resources"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, scroll_options=None,
+                 max_age=DEFAULT_TTL, extraction=DEFAULT_EXTRACTION, prompt_settings=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.scroll_options = scroll_options
+        self.max_age = max_age
+        self.extraction = extraction
+        self.prompt_settings = prompt_settings or {}
+        self.searches = SearchCoalescer()
+        # {(search key, generation range): (listing version, (lr_model, comparables, pricing_model))}
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='valuation')
+
+        self._lock = threading.Lock()
+        self._counts = {'queued': 0, 'active': 0, 'peak_queued': 0, 'requests': 0, 'completed': 0,
+                        'failed': 0, 'rejected': 0, 'models_reused': 0, 'total_seconds': 0.0}
+        self.started_at = time.time()
+
+    def warm(self, drivers=0):
+        """Create the shared resources now instead of on the first request; start
+        `drivers` browsers ahead of time"""
+        # Pay for the data stack imports before the first request
+        import numpy
+        import pandas
+
+        get_llm_client()
+        get_template_registry()
+        get_listing_store()
+        get_generation_cache()
+
+        pool = get_driver_pool()
+        pool.ensure_size(self.workers)
+        started = []
+        try:
+            for _ in range(min(drivers, self.workers)):
+                started.append(pool.acquire())
+        except Exception as e:
+            print(f"Could not start a browser ahead of time: {e}")
+        for driver in started:
+            pool.release(driver, pages=0)
+        print(f"Warmed shared resources and {len(started)} browsers")
+
+    def _count(self, **changes):
+        with self._lock:
+            for name, amount in changes.items():
+                self._counts[name] += amount
+            self._counts['peak_queued'] = max(self._counts['peak_queued'], self._counts['queued'])
+
+    def submit(self, row):
+        """Queue a valuation of one vehicle row; returns a Future of its JSON record.
+        Raises ValueError for an invalid row and QueueFull when the queue is full."""
+        settings = parse_vehicle(row)
+        prompt_settings = row.get('prompt_engineering') or {}
+        if not isinstance(prompt_settings, dict):
+            raise ValueError("prompt_engineering must be an object")
+        settings['prompt_engineering'] = dict(self.prompt_settings, **prompt_settings)
+
+        with self._lock:
+            self._counts['requests'] += 1
+            if self._counts['queued'] >= self.max_queue:
+                self._counts['rejected'] += 1
+                raise QueueFull(f"{self._counts['queued']} valuations are already waiting")
+            self._counts['queued'] += 1
+            self._counts['peak_queued'] = max(self._counts['peak_queued'], self._counts['queued'])
+        return self.executor.submit(self._valuate, settings, time.perf_counter())
+
+    def _valuate(self, settings, submitted):
+        self._count(queued=-1, active=1)
+        try:
+            key = search_key(settings)
+            # One trace per request; a request that waited for another's search
+            # has a shared_search span without the search stages under it
+            with span('request', city=key[0], make=key[1], model=key[2], model_year=settings['model_year'],
+                      queued_ms=round((time.perf_counter() - submitted) * 1000, 3)):
+                # Look up the generation while the search is scraping
+                generation_future = traced_submit(
+                    LLM_EXECUTOR, get_generation_range, settings['make'], settings['model'],
+                    settings['model_year'], settings['city'], settings['prompt_engineering']
+                )
+                store = get_search_store()
+                version = store.listing_version(*key)
+                with span('shared_search'):
+                    vehicle_df = self.searches.run(key, lambda: search_vehicles(
+                        *key, scroll_options=self.scroll_options, max_age=self.max_age, extraction=self.extraction
+                    ))
+                if store.listing_version(*key) != version:
+                    # Scraped or changed by another process meanwhile; don't cache this fit
+                    version = None
+                generation_range = generation_future.result()
+                lr_model, comparables, pricing_model = self._fit_models(key, generation_range, version, vehicle_df)
+                result = value_vehicle(settings, vehicle_df=vehicle_df, generation_range=generation_range,
+                                       lr_model=lr_model, comparables=comparables, pricing_model=pricing_model)
+                record = format_valuation(settings, result)
+        except Exception:
+            self._count(active=-1, failed=1)
+            raise
+        self._count(active=-1, completed=1, total_seconds=time.perf_counter() - submitted)
+        return record
+
+    def _fit_models(self, key, generation_range, version, vehicle_df):
+        """(lr_model, comparables, pricing_model) of a search's generation, reused while
+        the search's listing version is unchanged. version None always refits."""
+        model_key = key + tuple(generation_range)
+        with self._models_lock:
+            cached = self._models.get(model_key)
+        if version is not None and cached is not None and cached[0] == version:
+            self._count(models_reused=1)
+            return cached[1]
+
+        specific_vehicle_df = filter_generation(vehicle_df, *generation_range)
+        with span('fit_models', listings=len(specific_vehicle_df)):
+            models = (fit_price_model(specific_vehicle_df, key, generation_range),
+                      build_comparables(specific_vehicle_df),
+                      fit_pricing_model(specific_vehicle_df))
+        if version is not None:
+            with self._models_lock:
+                self._models[model_key] = (version, models)
+        return models
+
+    def metrics(self):
+        """Queue depth, worker use, request counters and LLM counters"""
+        with self._lock:
+            counts = dict(self._counts)
+        total_seconds = counts.pop('total_seconds')
+        return dict(
+            counts,
+            workers=self.workers,
+            max_queue=self.max_queue,
+            inflight_searches=self.searches.inflight(),
+            coalesced_searches=self.searches.coalesced,
+            mean_seconds=round(total_seconds / counts['completed'], 3) if counts['completed'] else None,
+            uptime_seconds=round(time.time() - self.started_at, 1),
+            llm=get_llm_client().stats(),
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """POST /valuate, GET /metrics and GET /health on the server's ValuationService"""
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self.send_json(200, self.server.service.metrics())
+        elif self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        else:
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/valuate':
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.send_json(400, {'error': "Invalid Content-Length"})
+            return
+        if length > MAX_BODY:
+            self.send_json(413, {'error': "Request body too large"})
+            return
+        try:
+            row = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+            future = self.server.service.submit(row)
+        except ValueError as e:
+            self.send_json(400, {'error': f"Invalid vehicle: {e}"})
+            return
+        except RecursionError:
+            self.send_json(400, {'error': "Invalid vehicle: JSON nested too deeply"})
+            return
+        except QueueFull as e:
+            self.send_json(503, {'error': str(e)}, {'Retry-After': '5'})
+            return
+        except Exception as e:
+            # Never drop the connection without an answer
+            print(f"Error queueing valuation: {e!r}")
+            self.send_json(500, {'error': "Could not queue the valuation"})
+            return
+
+        try:
+            record = future.result(timeout=self.server.request_timeout)
+        except FutureTimeout:
+            # Not the built-in TimeoutError before Python 3.11
+            self.send_json(504, {'error': "Valuation did not finish in time"})
+            return
+        except Exception as e:
+            # The exception text can hold URLs and paths; it is only logged
+            print(f"Error valuing vehicle: {e!r}")
+            self.send_json(500, {'error': "Valuation failed"})
+            return
+        self.send_json(200, record)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def serve(service, host='127.0.0.1', port=DEFAULT_PORT, request_timeout=DEFAULT_REQUEST_TIMEOUT, verbose=False):
+    """Create the HTTP server for a ValuationService; call serve_forever() on it"""
+    httpd = ThreadingHTTPServer((host, port), ServiceHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    httpd.request_timeout = request_timeout
+    httpd.verbose = verbose
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve vehicle valuations over local HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Valuations running at once")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Valuations allowed to wait for a worker before requests are rejected")
+    parser.add_argument('--request-timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help="Seconds a request waits for its valuation")
+    parser.add_argument('--warm-drivers', type=int, default=1, help="Browsers to start before serving")
+    parser.add_argument('--include-context', action='store_true',
+                        help="Use enhanced prompts and request AI price analysis and market insights")
+    parser.add_argument('--temperature', type=float, default=0.3, help="AI creativity for enhanced prompts")
+    parser.add_argument('--target-listings', type=int, default=DEFAULT_TARGET_COUNT,
+                        help="Stop scrolling once this many listings are loaded")
+    parser.add_argument('--scroll-budget', type=float, default=DEFAULT_TIME_BUDGET,
+                        help="Maximum seconds to spend scrolling each search")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_TTL,
+                        help="Reuse stored listings scraped less than this many seconds ago (0 always re-scrapes)")
+    parser.add_argument('--extraction', default=DEFAULT_EXTRACTION, choices=EXTRACTION_MODES,
+                        help="Parse page_source after scrolling, or collect new cards in the browser after each scroll")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+
+    service = ValuationService(
+        args.workers, args.max_queue,
+        scroll_options={'target_count': args.target_listings, 'time_budget': args.scroll_budget},
+        max_age=args.max_age, extraction=args.extraction,
+        prompt_settings={'include_context': args.include_context, 'temperature': args.temperature},
+    )
+    service.warm(args.warm_drivers)
+    httpd = serve(service, args.host, args.port, args.request_timeout, args.verbose)
+    print(f"Serving valuations at http://{args.host}:{args.port}/valuate ({args.workers} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Per-row error handling of batch valuation
+"""
+
+import json
+
+import pytest
+
+import batch
+import main
+from benchmarks.synthetic import card_records
+from normalize import normalize_listings
+
+VEHICLE = {'city': 'calgary', 'make': 'toyota', 'model': 'corolla', 'model_year': 2015,
+           'transmission': 'automatic', 'car_mileage': 120000}
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """Run batch valuations in tmp_path against synthetic listings, without a browser or the LLM"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch, 'search_vehicles',
+                        lambda city, make, model, transmission, **options: normalize_listings(
+                            card_records(300), make, model))
+    monkeypatch.setattr(main, 'get_generation_prompt', lambda *args, **kwargs: None)
+    return tmp_path
+
+
+def write_lines(path, lines):
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('line, message', [
+    ('{"car_mileage": Infinity}', 'car_mileage must be finite'),
+    ('{"car_mileage": NaN}', 'car_mileage must be finite'),
+    ('{"car_mileage": -1}', 'car_mileage must be between'),
+    ('{"car_mileage": "lots"}', 'car_mileage must be a number'),
+    ('{"car_mileage": 1e400}', 'car_mileage must be finite'),
+    ('{"model_year": 1850}', 'model_year must be between'),
+    ('{"model_year": [2015]}', 'invalid model_year'),
+])
+def test_bad_row_gets_an_error_record_and_the_next_row_is_valued(offline, line, message):
+    bad_row = dict(VEHICLE, **json.loads(line))
+    # Infinity and NaN are not valid JSON, so they are written as Python's json would
+    path = write_lines(offline / 'vehicles.jsonl', [
+        json.dumps(bad_row), json.dumps(VEHICLE), '{"city": "calgary"', json.dumps(dict(VEHICLE, car_mileage=90000)),
+    ])
+
+    results = list(batch.value_vehicles(batch.read_vehicles(path)))
+
+    assert [row_number for row_number, _, _, _ in results] == [1, 2, 3, 4]
+    assert results[0][2] is None and message in results[0][3]
+    assert results[2][2] is None and results[2][3]
+    for row_number, settings, result, error in (results[1], results[3]):
+        assert error is None
+        assert result['predicted_price'] > 0
+        record = batch.format_valuation(settings, result)
+        assert record['car_mileage'] == settings['car_mileage']
+        assert record['comparables_method'] in ('window', 'nearest')
+        assert record['comparables_max_distance'] >= 0
+    assert batch.format_error(*results[0][:2], results[0][3]) == {'row': 1, 'error': results[0][3]}
@@ -0,0 +1,53 @@
+"""
+Comparable prices of the mileage index, and how each was found
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from comparables import MileageIndex, NEAREST_METHOD, WINDOW_METHOD
+
+MILEAGES = [10_000, 50_000, 55_000, 60_000, 150_000, 200_000]
+PRICES = [20_000, 15_000, 14_000, 13_000, 8_000, 5_000]
+
+
+def test_dense_window_uses_the_window():
+    index = MileageIndex(MILEAGES, PRICES)
+    price, method, distance = index.comparables(52_000)
+    assert method == WINDOW_METHOD
+    assert price == pytest.approx(14_000)
+    assert distance == 8_000
+
+
+def test_sparse_window_falls_back_to_the_nearest():
+    index = MileageIndex(MILEAGES, PRICES)
+    # Only the 150,000 km listing is within ±20,000 km
+    price, method, distance = index.comparables(140_000)
+    assert method == NEAREST_METHOD
+    assert price == pytest.approx(np.mean([15_000, 14_000, 13_000, 8_000, 5_000]))
+    assert distance == 90_000
+
+
+def test_empty_window_falls_back_to_the_nearest():
+    index = MileageIndex(MILEAGES, PRICES)
+    price, method, distance = index.comparables(400_000)
+    assert method == NEAREST_METHOD
+    assert price == pytest.approx(np.mean([15_000, 14_000, 13_000, 8_000, 5_000]))
+    assert distance == 350_000
+
+
+def test_vectorized_matches_scalar_queries():
+    index = MileageIndex(MILEAGES, PRICES)
+    targets = [52_000, 140_000, 400_000, 0]
+    prices, methods, distances = index.comparables(targets)
+    for target, price, method, distance in zip(targets, prices, methods, distances):
+        assert (price, method, distance) == index.comparables(target)
+    assert list(index.comparable_prices(targets)) == list(prices)
+
+
+def test_no_listings():
+    price, method, distance = MileageIndex([], []).comparables(100_000)
+    assert method == NEAREST_METHOD
+    assert math.isnan(price) and math.isnan(distance)
@@ -0,0 +1,59 @@
+"""
+Generation ranges from the LLM: only usable answers are cached or learned
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from generation_cache import GenerationCache
+from llm_cache import ResponseCache
+from llm_client import LLMClient
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """LLM client answering from a list of replies, with caches in tmp_path"""
+    client = LLMClient(cache=ResponseCache(str(tmp_path / 'llm_cache.db')))
+    client.replies = []
+
+    def create(messages, max_tokens, temperature, model=None, **kwargs):
+        message = SimpleNamespace(content=client.replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(client, 'create', create)
+    monkeypatch.setattr(main, 'get_llm_client', lambda: client)
+    generation_cache = GenerationCache(table_file=str(tmp_path / 'table.json'),
+                                       cache_file=str(tmp_path / 'generation_cache.json'))
+    monkeypatch.setattr(main, 'get_generation_cache', lambda: generation_cache)
+    return client, generation_cache
+
+
+@pytest.mark.parametrize('answer', [
+    "It's a great car",
+    '2001-2005',
+    '1990-2019',
+])
+def test_rejected_answer_is_neither_cached_nor_learned(llm, answer):
+    client, generation_cache = llm
+    client.replies = [answer, '2014-2019']
+
+    assert main.get_generation_range('Acme', 'Roadster', 2016, 'calgary') == (2014, 2018)
+    assert generation_cache.lookup('Acme', 'Roadster', 2016) is None
+
+    # The next lookup asks again rather than repeating the rejected answer
+    assert main.get_generation_range('Acme', 'Roadster', 2016, 'calgary') == (2014, 2019)
+    assert generation_cache.lookup('Acme', 'Roadster', 2016) == (2014, 2019)
+    assert client.replies == []
+
+
+def test_valid_answer_is_served_from_the_response_cache(llm):
+    client, _ = llm
+    client.replies = ['2014-2019']
+    messages = [{'role': 'user', 'content': 'generation?'}]
+    valid = lambda answer: answer.startswith('2014')
+
+    assert client.complete(messages, 100, 0.0, valid=valid) == '2014-2019'
+    assert client.complete(messages, 100, 0.0, valid=valid) == '2014-2019'
+    assert client.replies == []
@@ -0,0 +1,50 @@
+"""
+Every HTML parser backend returns the same listing cards as BeautifulSoup
+"""
+
+import pytest
+
+from html_parsers import TITLE_CLASS, PRICE_CLASS, CONTENT_CLASS, available_backends, extract_listing_cards
+from benchmarks.bench_parsers import load_fixtures
+from benchmarks.synthetic import marketplace_page
+
+pytest.importorskip('bs4')
+
+BACKENDS = [backend for backend in available_backends() if backend != 'bs4']
+
+# Cards missing spans, extra content, nested markup, a link without an item id
+# and listing spans outside any card
+EDGE_CASE_PAGE = f"""
+<html><body>
+<span class="{TITLE_CLASS}">Not a card</span>
+<a href="/marketplace/item/111/?ref=search">
+  <span class="{PRICE_CLASS}">CA$9,000</span>
+  <span class="{TITLE_CLASS}"><b>2014</b> Toyota Corolla</span>
+  <span class="{CONTENT_CLASS}">Just listed</span>
+  <span class="{CONTENT_CLASS}">Red Deer, AB</span>
+  <span class="{CONTENT_CLASS}">150K km</span>
+</a>
+<a href="/marketplace/item/222/"><span class="{TITLE_CLASS}">2016 Toyota Corolla</span></a>
+<a href="/marketplace/item/"><span class="{PRICE_CLASS}">$1</span><span class="{CONTENT_CLASS}">90K miles</span></a>
+<a href="/marketplace/item/333/"></a>
+</body></html>
+"""
+
+PAGES = [('synthetic', marketplace_page(200)), ('edge cases', EDGE_CASE_PAGE)] + list(load_fixtures())
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name, html', PAGES, ids=[name for name, _ in PAGES])
+def test_backend_matches_bs4(backend, name, html):
+    assert extract_listing_cards(html, backend) == extract_listing_cards(html, 'bs4')
+
+
+def test_edge_case_cards():
+    cards = extract_listing_cards(EDGE_CASE_PAGE, 'bs4')
+    assert cards == [
+        {'item_id': '111', 'title': '2014 Toyota Corolla', 'price': 'CA$9,000', 'location': 'Red Deer, AB',
+         'mileage': '150K km'},
+        {'item_id': '222', 'title': '2016 Toyota Corolla', 'price': None, 'location': None, 'mileage': None},
+        {'item_id': None, 'title': None, 'price': '$1', 'location': None, 'mileage': '90K miles'},
+        {'item_id': '333', 'title': None, 'price': None, 'location': None, 'mileage': None},
+    ]
@@ -0,0 +1,45 @@
+"""
+ListingStore keys and merges
+"""
+
+import pandas as pd
+
+from listing_store import ListingStore
+from normalize import LISTING_COLUMNS
+
+SEARCH = ('calgary', 'toyota', 'corolla', 'automatic')
+
+
+def listing_frame(rows):
+    """DataFrame of (item id, year, price, mileage) rows"""
+    return pd.DataFrame([
+        {'Year': year, 'Make': 'Toyota', 'Model': 'Corolla', 'Price': price, 'Location': 'Calgary, AB',
+         'Mileage': mileage, 'ItemId': item_id}
+        for item_id, year, price, mileage in rows
+    ], columns=LISTING_COLUMNS)
+
+
+def test_listings_with_the_same_contents_are_kept_apart(tmp_path):
+    store = ListingStore(str(tmp_path / 'listings.db'))
+    assert store.merge_listings(*SEARCH, listing_frame([('1', 2016, 15000, 80000), ('2', 2016, 15000, 80000)])) == 2
+    assert [listing['ItemId'] for listing in store.get_listings(*SEARCH)] == ['1', '2']
+    store.close()
+
+
+def test_a_relisted_price_updates_the_item(tmp_path):
+    store = ListingStore(str(tmp_path / 'listings.db'))
+    store.merge_listings(*SEARCH, listing_frame([('1', 2016, 15000, 80000)]), scraped_at=100)
+    assert store.merge_listings(*SEARCH, listing_frame([('1', 2016, 14000, 81000)]), scraped_at=200) == 0
+    # An older scrape does not overwrite a newer one
+    store.merge_listings(*SEARCH, listing_frame([('1', 2016, 16000, 79000)]), scraped_at=150)
+    listings = store._conn.execute("SELECT price, mileage, first_seen, scraped_at FROM listings").fetchall()
+    assert listings == [(14000, 81000, 100, 200)]
+    store.close()
+
+
+def test_cards_without_an_item_id_are_keyed_by_contents(tmp_path):
+    store = ListingStore(str(tmp_path / 'listings.db'))
+    rows = [(None, 2016, 15000, 80000), (None, 2016, 15000, 80000), (None, 2017, 15000, 80000)]
+    assert store.merge_listings(*SEARCH, listing_frame(rows)) == 2
+    store.close()
+
@@ -0,0 +1,147 @@
+"""
+RunningRegression and the listing store's regressions against scikit-learn
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regression import RunningRegression
+from listing_store import ListingStore
+from normalize import LISTING_COLUMNS
+
+LinearRegression = pytest.importorskip('sklearn.linear_model').LinearRegression
+
+TARGETS = np.array([0, 50_000, 150_000, 400_000])
+SEARCH = ('calgary', 'toyota', 'corolla', 'automatic')
+GENERATION = (2014, 2019)
+
+
+def listings(count, seed=0):
+    """Synthetic (mileages, prices) with a depreciation trend and noise"""
+    rng = np.random.default_rng(seed)
+    mileages = rng.integers(5_000, 350_000, count)
+    prices = np.maximum(500, 22_000 - 0.05 * mileages + rng.normal(0, 1_500, count)).astype(np.int64)
+    return mileages, prices
+
+
+def assert_matches_sklearn(regression, mileages, prices):
+    reference = LinearRegression().fit(np.asarray(mileages).reshape(-1, 1), prices)
+    assert regression.n == len(prices)
+    assert regression.slope == pytest.approx(reference.coef_[0], rel=1e-9, abs=1e-12)
+    assert regression.intercept == pytest.approx(reference.intercept_, rel=1e-9)
+    np.testing.assert_allclose(regression.predict(TARGETS), reference.predict(TARGETS.reshape(-1, 1)), rtol=1e-9)
+    for target, expected in zip(TARGETS, reference.predict(TARGETS.reshape(-1, 1))):
+        assert regression.predict(target) == pytest.approx(expected, rel=1e-9)
+
+    if len(prices) > 2:
+        residuals = prices - reference.predict(np.asarray(mileages).reshape(-1, 1))
+        expected_std = np.sqrt(np.dot(residuals, residuals) / (len(prices) - 2))
+        assert regression.residual_std == pytest.approx(expected_std, rel=1e-7)
+
+
+@pytest.mark.parametrize('count', [2, 10, 1000, 100_000])
+def test_fit_matches_sklearn(count):
+    mileages, prices = listings(count)
+    assert_matches_sklearn(RunningRegression.from_arrays(mileages, prices), mileages, prices)
+
+
+def test_same_mileage_has_zero_slope_like_sklearn():
+    _, prices = listings(50, seed=1)
+    mileages = np.full(50, 120_000)
+    assert_matches_sklearn(RunningRegression.from_arrays(mileages, prices), mileages, prices)
+
+
+def test_add_and_remove_match_refit():
+    mileages, prices = listings(200, seed=2)
+    regression = RunningRegression()
+    for mileage, price in zip(mileages, prices):
+        regression.add(mileage, price)
+    assert_matches_sklearn(regression, mileages, prices)
+
+    # The oldest listings expire one at a time, then a batch at once
+    for mileage, price in zip(mileages[:50], prices[:50]):
+        regression.remove(mileage, price)
+    regression.remove_many(mileages[50:100], prices[50:100])
+    assert_matches_sklearn(regression, mileages[100:], prices[100:])
+
+    regression.add_many(mileages[:20], prices[:20])
+    assert_matches_sklearn(regression, np.concatenate([mileages[100:], mileages[:20]]),
+                           np.concatenate([prices[100:], prices[:20]]))
+
+
+def test_removing_everything_resets():
+    mileages, prices = listings(10, seed=3)
+    regression = RunningRegression.from_arrays(mileages, prices)
+    regression.remove_many(mileages, prices)
+    assert regression.summary() == {'n': 0, 'slope': 0.0, 'intercept': 0.0, 'residual_std': 0.0}
+    with pytest.raises(ValueError):
+        regression.remove(mileages[0], prices[0])
+
+
+def listing_frame(count, seed, first_id=0):
+    rng = np.random.default_rng(seed)
+    mileages, prices = listings(count, seed)
+    return pd.DataFrame({
+        'Year': rng.integers(2010, 2023, count),
+        'Make': 'toyota',
+        'Model': 'corolla',
+        'Price': prices,
+        'Location': 'Calgary, AB',
+        'Mileage': mileages,
+        'ItemId': [str(first_id + index) for index in range(count)],
+    }, columns=LISTING_COLUMNS)
+
+
+def generation_of(vehicle_df):
+    return vehicle_df[(vehicle_df['Year'] >= GENERATION[0]) & (vehicle_df['Year'] <= GENERATION[1])]
+
+
+def test_store_regression_follows_merges_and_expiry(tmp_path):
+    store = ListingStore(str(tmp_path / 'listings.db'), retention=100)
+    now = time.time()
+    first = listing_frame(300, seed=4)
+    assert store.merge_listings(*SEARCH, first, scraped_at=now - 80) == 300
+    expected = generation_of(first)
+    assert_matches_sklearn(store.price_regression(*SEARCH, GENERATION), expected['Mileage'], expected['Price'])
+
+    # A second scrape sees half of the first listings again, some with a lower
+    # price, plus new ones
+    seen_again = first.iloc[150:].copy()
+    seen_again.loc[seen_again.index[::3], 'Price'] -= 500
+    second = pd.concat([seen_again, listing_frame(100, seed=5, first_id=1000)], ignore_index=True)
+    assert store.merge_listings(*SEARCH, second, scraped_at=now - 30) == 100
+    expected = generation_of(pd.concat([first.iloc[:150], second]))
+    assert_matches_sklearn(store.price_regression(*SEARCH, GENERATION), expected['Mileage'], expected['Price'])
+    assert len(store.get_listings(*SEARCH)) == 400
+
+    # Listings only seen in the first scrape expire with the third
+    store.merge_listings(*SEARCH, second.iloc[:0], scraped_at=now + 30)
+    expected = generation_of(second)
+    assert_matches_sklearn(store.price_regression(*SEARCH, GENERATION), expected['Mileage'], expected['Price'])
+    store.close()
+
+
+def test_store_regression_follows_other_processes(tmp_path):
+    path = str(tmp_path / 'listings.db')
+    store = ListingStore(path)
+    other = ListingStore(path)
+    first = listing_frame(200, seed=7)
+    store.merge_listings(*SEARCH, first)
+    store.price_regression(*SEARCH, GENERATION)
+
+    # Another process sharing listings.db merges a scrape of the same search
+    second = listing_frame(100, seed=8, first_id=1000)
+    other.merge_listings(*SEARCH, second)
+    expected = generation_of(pd.concat([first, second]))
+    assert_matches_sklearn(store.price_regression(*SEARCH, GENERATION), expected['Mileage'], expected['Price'])
+
+    # Later merges by this process keep the refitted regression current
+    third = listing_frame(50, seed=9, first_id=2000)
+    store.merge_listings(*SEARCH, third)
+    expected = generation_of(pd.concat([first, second, third]))
+    assert_matches_sklearn(store.price_regression(*SEARCH, GENERATION), expected['Mileage'], expected['Price'])
+    other.close()
+    store.close()
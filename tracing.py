@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing spans for AutoValuate
+Every stage of a valuation runs inside a span that records its duration and
+a few attributes such as listing counts and cache hits. A span opened with
+no span around it starts a new trace, so each valuation is one trace whose
+stages, LLM calls included, are its child spans. Finished spans are appended
+as JSON lines to the file named by AUTOVALUATE_TRACE ('-' for stderr).
+
+When AUTOVALUATE_TRACE is unset, span() returns one shared no-op object, so
+the instrumentation costs a function call per stage.
+
+    AUTOVALUATE_TRACE=trace.jsonl python main.py
+    python tracing.py trace.jsonl          # print the last trace as a tree
+"""
+
+import argparse
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+TRACE_ENV = 'AUTOVALUATE_TRACE'
+
+_current_span = contextvars.ContextVar('autovaluate_span', default=None)
+_span_ids = itertools.count(1)
+_writer = None
+
+
+class NullSpan:
+    """Stand-in returned by span() while tracing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class TraceWriter:
+    """Appends span records to a JSON lines file, one line per span"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self.path == '-':
+                sys.stderr.write(line)
+                return
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Span:
+    """One timed stage; written to the trace file when it exits"""
+
+    def __init__(self, writer, name, attrs):
+        parent = _current_span.get()
+        self.writer = writer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self._token = None
+
+    def set(self, **attrs):
+        """Add or overwrite attributes, e.g. counts known only at the end of the stage"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        record = {
+            'trace': self.trace_id,
+            'span': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(duration * 1000, 3),
+            'thread': threading.current_thread().name,
+            'attrs': self.attrs,
+        }
+        if exc_type is not None:
+            record['error'] = f"{exc_type.__name__}: {exc}"
+        self.writer.write(record)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing one stage; a new trace when no span is open"""
+    writer = _writer
+    if writer is None:
+        return NULL_SPAN
+    return Span(writer, name, attrs)
+
+
+def enabled():
+    return _writer is not None
+
+
+def configure(path=None):
+    """Write spans to path ('-' for stderr). None reads AUTOVALUATE_TRACE; an
+    empty value disables tracing."""
+    global _writer
+    if path is None:
+        path = os.getenv(TRACE_ENV)
+    if _writer is not None:
+        if _writer.path == path:
+            return
+        _writer.close()
+    _writer = TraceWriter(path) if path else None
+
+
+def traced_submit(executor, function, *args, **kwargs):
+    """executor.submit that runs function inside the caller's open span, so
+    work moved to another thread stays in the same trace"""
+    return executor.submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+
+def load_traces(path):
+    """{trace id: [span records]} from a trace file, in file order"""
+    traces = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                traces.setdefault(record['trace'], []).append(record)
+    return traces
+
+
+def format_trace(records):
+    """Indented tree of one trace's spans ordered by start time"""
+    children = {}
+    for record in sorted(records, key=lambda record: record['start']):
+        children.setdefault(record['parent'], []).append(record)
+
+    lines = []
+
+    def add(record, depth):
+        attrs = ' '.join(f"{key}={value}" for key, value in record['attrs'].items())
+        error = f" ERROR {record['error']}" if 'error' in record else ''
+        lines.append(f"{record['duration_ms']:>10.1f} ms  {'  ' * depth}{record['name']}  {attrs}{error}".rstrip())
+        for child in children.get(record['span'], []):
+            add(child, depth + 1)
+
+    span_ids = {record['span'] for record in records}
+    for record in sorted(records, key=lambda record: record['start']):
+        # Roots, and spans whose parent ended up outside this file
+        if record['parent'] is None or record['parent'] not in span_ids:
+            add(record, 0)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print traces written with AUTOVALUATE_TRACE")
+    parser.add_argument('path')
+    parser.add_argument('--all', action='store_true', help="Print every trace instead of the last one")
+    args = parser.parse_args(argv)
+
+    traces = list(load_traces(args.path).items())
+    if not traces:
+        print("No traces found")
+        return 1
+    for trace_id, records in (traces if args.all else traces[-1:]):
+        print(f"trace {trace_id}")
+        print(format_trace(records))
+    return 0
+
+
+configure()
+
+if __name__ == "__main__":
+    sys.exit(main())
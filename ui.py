@@ -2,120 +2,27 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import sys
 import json
+import math
+import queue
+import threading
+from comparables import COMPARABLE_MILEAGE_WINDOW, NEAREST_METHOD, WINDOW_METHOD
+from prompt_engineering import PromptEngineering
+from valuation_progress import VALUATION_STAGES, STAGE_NAMES, ValuationCancelled, ValuationProgress
 
-class PromptEngineering:
-    """Advanced prompt engineering for AI interactions"""
-    
-    def __init__(self):
-        self.prompt_templates = {
-            'vehicle_generation': {
-                'system': "You are an expert automotive analyst specializing in vehicle generations and model years. Provide accurate, concise information about vehicle generations.",
-                'user_template': "What generation does a {year} {make} {model} belong to? Please answer with only the year range of the generation, e.g., '2000-2005'. If uncertain, provide the most likely range based on common knowledge.",
-                'examples': [
-                    {"input": "What generation does a 2005 Toyota Corolla belong to?", "output": "2003-2008"},
-                    {"input": "What generation does a 2018 Honda Civic belong to?", "output": "2016-2021"}
-                ]
-            },
-            'price_analysis': {
-                'system': "You are a professional vehicle appraiser with expertise in market analysis. Analyze vehicle pricing factors and provide insights.",
-                'user_template': "Analyze the pricing for a {year} {make} {model} with {mileage}km in {city}. Consider factors like market trends, location, and condition. Provide a brief analysis in 2-3 sentences.",
-                'examples': [
-                    {"input": "Analyze pricing for a 2010 Honda Civic with 150000km in Toronto", "output": "The 2010 Honda Civic is in the 8th generation (2006-2011), known for reliability. With 150,000km, this vehicle is in the mid-life range where depreciation typically stabilizes. Toronto's market tends to command higher prices due to urban demand and limited parking, suggesting a premium of 10-15% over rural areas."}
-                ]
-            },
-            'market_insights': {
-                'system': "You are a market research analyst specializing in automotive industry trends and regional market dynamics.",
-                'user_template': "What are the key market factors affecting {make} {model} prices in {city}? Consider seasonal trends, supply/demand, and regional preferences.",
-                'examples': [
-                    {"input": "What affects Toyota Corolla prices in Calgary?", "output": "Calgary's Toyota Corolla market is influenced by the city's strong economy and preference for reliable vehicles. Winter conditions favor AWD/4WD models, while fuel efficiency remains important. Seasonal fluctuations occur with spring/summer typically showing 5-10% higher prices due to increased demand."}
-                ]
-            }
-        }
-        
-        self.context_enhancers = {
-            'seasonal_factors': [
-                "Consider current season and its impact on vehicle demand",
-                "Factor in seasonal maintenance requirements",
-                "Account for weather-related market fluctuations"
-            ],
-            'market_conditions': [
-                "Include current economic indicators",
-                "Consider supply chain impacts",
-                "Factor in fuel price trends"
-            ],
-            'regional_specifics': [
-                "Account for local market preferences",
-                "Consider regional economic factors",
-                "Include local competition analysis"
-            ]
-        }
-    
-    def build_prompt(self, template_name, variables, include_context=True, temperature=0.3):
-        """Build a structured prompt with context and examples"""
-        if template_name not in self.prompt_templates:
-            raise ValueError(f"Unknown template: {template_name}")
-        
-        template = self.prompt_templates[template_name]
-        
-        # Build the main prompt
-        user_prompt = template['user_template'].format(**variables)
-        
-        # Add context if requested
-        if include_context:
-            context_parts = []
-            for context_type, factors in self.context_enhancers.items():
-                context_parts.extend(factors)
-            
-            context_text = "Additional considerations:\n" + "\n".join(f"• {factor}" for factor in context_parts[:3])
-            user_prompt += f"\n\n{context_text}"
-        
-        # Add examples if available
-        if template.get('examples'):
-            examples_text = "\n\nExamples:\n"
-            for example in template['examples']:
-                examples_text += f"Q: {example['input']}\nA: {example['output']}\n"
-            user_prompt += examples_text
-        
-        return {
-            'system': template['system'],
-            'user': user_prompt,
-            'temperature': temperature,
-            'max_tokens': 200
-        }
-    
-    def get_enhanced_generation_prompt(self, make, model, year, city):
-        """Get enhanced generation prompt with market context"""
-        variables = {
-            'year': year,
-            'make': make,
-            'model': model,
-            'city': city
-        }
-        return self.build_prompt('vehicle_generation', variables, include_context=True)
-    
-    def get_price_analysis_prompt(self, make, model, year, mileage, city):
-        """Get price analysis prompt with market insights"""
-        variables = {
-            'year': year,
-            'make': make,
-            'model': model,
-            'mileage': f"{mileage:,}",
-            'city': city
-        }
-        return self.build_prompt('price_analysis', variables, include_context=True)
-    
-    def get_market_insights_prompt(self, make, model, city):
-        """Get market insights prompt for regional analysis"""
-        variables = {
-            'make': make,
-            'model': model,
-            'city': city
-        }
-        return self.build_prompt('market_insights', variables, include_context=True)
+# How often the Tk loop picks up events from the valuation worker
+EVENT_POLL_MS = 50
+
+STAGE_LABELS = dict(VALUATION_STAGES)
 
 class VehicleUI:
-    def __init__(self, root):
+    def __init__(self, root, valuate=None):
+        """valuate(settings, stream_ai=True, progress=...) runs a valuation on a
+        worker thread and opens its results; without it Start only closes the
+        window so run_ui() can return the settings"""
         self.root = root
+        self.valuate = valuate
+        self.progress = None
+        self.events = queue.Queue()
         self.root.title("Vehicle Price Predictor with AI Prompt Engineering")
         self.root.geometry("800x700")
         self.root.configure(bg='#f0f0f0')
@@ -236,8 +143,9 @@ class VehicleUI:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=4, column=0, columnspan=3, pady=20)
         
-        ttk.Button(button_frame, text="Start Search with Enhanced AI", 
-                  command=self.start_search).grid(row=0, column=0, padx=(0, 10))
+        self.start_button = ttk.Button(button_frame, text="Start Search with Enhanced AI", 
+                                      command=self.start_search)
+        self.start_button.grid(row=0, column=0, padx=(0, 10))
         ttk.Button(button_frame, text="Save Prompt Settings", 
                   command=self.save_prompt_settings).grid(row=0, column=1, padx=(0, 10))
         ttk.Button(button_frame, text="Load Prompt Settings", 
@@ -245,6 +153,20 @@ class VehicleUI:
         ttk.Button(button_frame, text="Exit", 
                   command=self.exit_program).grid(row=0, column=3)
         
+        # Search progress
+        progress_frame = ttk.LabelFrame(main_frame, text="Search Progress", padding="15")
+        progress_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 20))
+        
+        self.status_label = ttk.Label(progress_frame, text="Ready")
+        self.status_label.grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+        self.progress_bar = ttk.Progressbar(progress_frame, orient=tk.HORIZONTAL, length=400, 
+                                            mode='determinate', maximum=len(STAGE_NAMES))
+        self.progress_bar.grid(row=1, column=0, sticky=(tk.W, tk.E), padx=(0, 10))
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", 
+                                       command=self.cancel_search, state=tk.DISABLED)
+        self.cancel_button.grid(row=1, column=1)
+        progress_frame.columnconfigure(0, weight=1)
+        
         # Configure grid weights
         main_frame.columnconfigure(1, weight=1)
         prompt_frame.columnconfigure(1, weight=1)
@@ -415,27 +337,154 @@ class VehicleUI:
     def start_search(self):
         """Start the vehicle search with current settings"""
         settings = self.get_settings()
-        if settings:
+        if not settings:
+            return None
+        if self.valuate is None:
             self.root.quit()
             return settings
-        return None
+        if self.progress is None:
+            self.run_valuation(settings)
+        return settings
+    
+    def run_valuation(self, settings):
+        """Value the vehicle on a worker thread; the Tk loop follows its progress"""
+        progress = ValuationProgress(on_stage=lambda stage, detail: self.events.put(('stage', stage, detail)))
+        self.progress = progress
+        self.start_button.configure(state=tk.DISABLED)
+        self.cancel_button.configure(state=tk.NORMAL)
+        self.progress_bar.configure(value=0)
+        self.status_label.configure(text="Starting search...")
+        
+        def work():
+            try:
+                result = self.valuate(settings, stream_ai=True, progress=progress)
+                self.events.put(('result', result))
+            except ValuationCancelled:
+                self.events.put(('cancelled',))
+            except Exception as e:
+                print(f"Error valuing vehicle: {e}")
+                self.events.put(('error', e))
+        
+        threading.Thread(target=work, name='valuation', daemon=True).start()
+        self.root.after(EVENT_POLL_MS, self.poll_events)
+    
+    def poll_events(self):
+        """Apply the worker's events to the widgets; runs on the Tk thread"""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind = event[0]
+            if kind == 'stage':
+                _, stage, detail = event
+                self.progress_bar.configure(value=STAGE_NAMES.index(stage) + 1)
+                label = STAGE_LABELS[stage]
+                self.status_label.configure(text=f"{label} ({detail})" if detail else f"{label}...")
+                continue
+            
+            self.finish_search()
+            if kind == 'result':
+                result = event[1]
+                self.progress_bar.configure(value=len(STAGE_NAMES))
+                self.status_label.configure(text=f"Done: {result['vehicles_found']} vehicles found")
+                show_results(result['vehicle_info'], result['lr_predicted_price'], result['average_price'],
+                            result['predicted_price'], result['vehicles_found'],
+                            result['ai_price_analysis'], result['market_insights'], result['model_predicted_price'],
+                            master=self.root, on_new_search=self.new_search,
+                            comparables_method=result['comparables_method'],
+                            comparables_max_distance=result['comparables_max_distance'])
+            elif kind == 'cancelled':
+                self.progress_bar.configure(value=0)
+                self.status_label.configure(text="Search cancelled")
+            else:
+                self.progress_bar.configure(value=0)
+                self.status_label.configure(text="Search failed")
+                messagebox.showerror("Error", f"Error valuing vehicle: {str(event[1])}")
+            return
+        
+        self.root.after(EVENT_POLL_MS, self.poll_events)
+    
+    def finish_search(self):
+        self.progress = None
+        self.start_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.DISABLED)
+    
+    def cancel_search(self):
+        """Stop the running valuation at its next stage"""
+        if self.progress is not None:
+            self.progress.cancel()
+            self.cancel_button.configure(state=tk.DISABLED)
+            self.status_label.configure(text="Cancelling...")
+    
+    def new_search(self):
+        """Bring the search form back for another vehicle"""
+        self.root.deiconify()
+        self.root.lift()
+        self.status_label.configure(text="Ready")
+        self.progress_bar.configure(value=0)
     
     def exit_program(self):
         """Exit the program completely"""
+        if self.progress is not None:
+            self.progress.cancel()
         self.root.quit()
         self.root.destroy()
         sys.exit(0)
 
+STREAM_POLL_MS = 50
+
+
+def _is_stream(value):
+    """True for a TextStream that is still being filled in the background"""
+    return hasattr(value, 'drain')
+
+
+def _initial_text(value):
+    return "Generating..." if _is_stream(value) else value
+
+
+def _follow_stream(window, label, stream):
+    """Append a TextStream's chunks to a label as they arrive, polling from the Tk loop"""
+    if not _is_stream(stream):
+        return
+    parts = []
+
+    def poll():
+        if not label.winfo_exists():
+            return
+        # Every chunk is queued before the stream is marked done
+        finished = stream.done
+        chunks = stream.drain()
+        if chunks:
+            parts.extend(chunks)
+            label.configure(text=''.join(parts).lstrip())
+        if finished:
+            if not ''.join(parts).strip():
+                label.configure(text="Not available")
+            return
+        window.after(STREAM_POLL_MS, poll)
+
+    window.after(STREAM_POLL_MS, poll)
+
+
 def show_results(vehicle_info, lr_predicted_price, average_price, final_price, vehicles_found, 
-                ai_price_analysis=None, market_insights=None):
-    """Show results in a popup window with AI analysis"""
-    result_window = tk.Tk()
+                ai_price_analysis=None, market_insights=None, model_predicted_price=None,
+                master=None, on_new_search=None, comparables_method=None, comparables_max_distance=None):
+    """Show results in a popup window with AI analysis. ai_price_analysis and
+    market_insights may be strings or TextStreams that fill in as they stream.
+    With master the window is a Toplevel of the running app; without it the
+    window runs its own main loop. on_new_search adds a New Search button.
+    comparables_method and comparables_max_distance say how the average
+    comparable price was found."""
+    result_window = tk.Toplevel(master) if master is not None else tk.Tk()
     result_window.title("Price Prediction Results with AI Analysis")
     result_window.geometry("600x700")
     result_window.configure(bg='#f0f0f0')
     
     # Center the window
-    result_window.eval('tk::PlaceWindow . center')
+    result_window.eval(f'tk::PlaceWindow {result_window} center')
     
     # Main frame
     main_frame = ttk.Frame(result_window, padding="20")
@@ -463,13 +512,21 @@ def show_results(vehicle_info, lr_predicted_price, average_price, final_price, v
     
     ttk.Label(results_frame, text=f"Linear Regression Prediction: ${lr_predicted_price:,.2f}", 
               font=('Arial', 11)).grid(row=0, column=0, sticky=tk.W, pady=2)
-    ttk.Label(results_frame, text=f"Average Comparable Price: ${average_price:,.2f}", 
+    comparables_note = ""
+    if comparables_method == NEAREST_METHOD and not math.isnan(comparables_max_distance):
+        comparables_note = f" (nearest listings, up to {comparables_max_distance:,.0f} km away)"
+    elif comparables_method == WINDOW_METHOD:
+        comparables_note = f" (listings within ±{COMPARABLE_MILEAGE_WINDOW:,} km)"
+    ttk.Label(results_frame, text=f"Average Comparable Price: ${average_price:,.2f}{comparables_note}", 
               font=('Arial', 11)).grid(row=1, column=0, sticky=tk.W, pady=2)
+    if model_predicted_price:
+        ttk.Label(results_frame, text=f"Mileage/Year/City Model Prediction: ${model_predicted_price:,.2f}", 
+                  font=('Arial', 11)).grid(row=2, column=0, sticky=tk.W, pady=2)
     
     # Final price (highlighted)
     final_price_label = ttk.Label(results_frame, text=f"FINAL PREDICTED PRICE: ${final_price:,.2f}", 
                                  font=('Arial', 14, 'bold'), foreground='green')
-    final_price_label.grid(row=2, column=0, sticky=tk.W, pady=(10, 2))
+    final_price_label.grid(row=3, column=0, sticky=tk.W, pady=(10, 2))
     
     # Data info
     info_frame = ttk.LabelFrame(main_frame, text="Data Analysis", padding="10")
@@ -486,31 +543,31 @@ def show_results(vehicle_info, lr_predicted_price, average_price, final_price, v
         if ai_price_analysis:
             ttk.Label(ai_frame, text="AI Price Analysis:", 
                       font=('Arial', 11, 'bold')).grid(row=0, column=0, sticky=tk.W, pady=(5, 2))
-            ai_analysis_label = ttk.Label(ai_frame, text=ai_price_analysis, 
+            ai_analysis_label = ttk.Label(ai_frame, text=_initial_text(ai_price_analysis), 
                                          wraplength=500, justify=tk.LEFT)
             ai_analysis_label.grid(row=1, column=0, sticky=tk.W, pady=(0, 10))
+            _follow_stream(result_window, ai_analysis_label, ai_price_analysis)
         
         if market_insights:
             ttk.Label(ai_frame, text="Market Insights:", 
                       font=('Arial', 11, 'bold')).grid(row=2, column=0, sticky=tk.W, pady=(5, 2))
-            market_insights_label = ttk.Label(ai_frame, text=market_insights, 
+            market_insights_label = ttk.Label(ai_frame, text=_initial_text(market_insights), 
                                             wraplength=500, justify=tk.LEFT)
             market_insights_label.grid(row=3, column=0, sticky=tk.W, pady=(0, 5))
+            _follow_stream(result_window, market_insights_label, market_insights)
     
     # Add buttons
     button_frame = ttk.Frame(main_frame)
     button_frame.grid(row=5, column=0, columnspan=2, pady=20)
     
-    def new_search():
-        result_window.destroy()
-        # Restart the application
-        import subprocess
-        import sys
-        subprocess.Popen([sys.executable, 'main.py'])
-        sys.exit(0)
-    
-    ttk.Button(button_frame, text="New Search", 
-              command=new_search).grid(row=0, column=0, padx=(0, 10))
+    if on_new_search is not None:
+        def new_search():
+            # The search form is still open; caches and browsers stay warm
+            result_window.destroy()
+            on_new_search()
+        
+        ttk.Button(button_frame, text="New Search", 
+                  command=new_search).grid(row=0, column=0, padx=(0, 10))
     ttk.Button(button_frame, text="Close", 
               command=result_window.destroy).grid(row=0, column=1)
     
@@ -519,7 +576,16 @@ def show_results(vehicle_info, lr_predicted_price, average_price, final_price, v
         result_window.destroy()
     
     result_window.protocol("WM_DELETE_WINDOW", on_closing)
-    result_window.mainloop()
+    if master is None:
+        result_window.mainloop()
+    return result_window
+
+def run_app(valuate):
+    """Run the search form as one long-lived window; each search is valued
+    in-process by valuate on a worker thread"""
+    root = tk.Tk()
+    VehicleUI(root, valuate)
+    root.mainloop()
 
 def run_ui():
     """Run the UI and return the settings"""
@@ -0,0 +1,66 @@
+"""
+Stage progress and cancellation of a running valuation
+The pipeline reports each stage it starts to a ValuationProgress, which
+passes it on to a callback such as the UI's event queue. cancel() is
+checked at every stage boundary: stage() then raises ValuationCancelled, and
+scrolling stops at the next scroll. Inside a borrowed browser only the
+non-raising report() is used, so a cancelled search hands its driver back to
+the pool instead of discarding it.
+"""
+
+import threading
+
+# (stage, label) in the order a valuation runs them; stored listings skip
+# page_load, scroll and parse
+VALUATION_STAGES = [
+    ('search', "Checking stored listings"),
+    ('page_load', "Opening the Marketplace search"),
+    ('scroll', "Scrolling listings"),
+    ('parse', "Reading listings"),
+    ('clean', "Cleaning listings"),
+    ('generation_range', "Finding the vehicle generation"),
+    ('price_models', "Fitting price models"),
+    ('ai_analysis', "Waiting for the AI analysis"),
+]
+
+STAGE_NAMES = [name for name, _ in VALUATION_STAGES]
+
+
+class ValuationCancelled(Exception):
+    """Raised at a stage boundary after the valuation was cancelled"""
+
+
+class ValuationProgress:
+    """Forwards stage changes to on_stage(stage, detail) and carries the cancel flag.
+    on_stage is called on the pipeline's threads and must not touch Tk widgets."""
+
+    def __init__(self, on_stage=None):
+        self.on_stage = on_stage
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def report(self, stage, detail=None):
+        """Report progress without checking for cancellation"""
+        if self.on_stage is not None:
+            self.on_stage(stage, detail)
+
+    def stage(self, stage, detail=None):
+        """Start a stage; raises ValuationCancelled once cancel() was called"""
+        if self._cancelled.is_set():
+            raise ValuationCancelled()
+        self.report(stage, detail)
+
+    def scroll_options(self, scroll_options=None, on_scroll=None):
+        """scroll_listings options that report every scroll and stop scrolling on cancel.
+        on_scroll(added, total) is still called after the report."""
+        def report_scroll(added, total):
+            if on_scroll is not None:
+                on_scroll(added, total)
+            self.report('scroll', f"{total} listings loaded")
+
+        return dict(scroll_options or {}, on_scroll=report_scroll, should_stop=self.is_cancelled)